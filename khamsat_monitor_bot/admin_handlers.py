@@ -1,6 +1,10 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from user_manager import user_manager
+from settings_manager import settings_manager
+from scheduler import poll_scheduler
+from metrics import metrics_summary
+from latency import latency_tracker
 from config import logger
 
 class AdminHandlers:
@@ -52,17 +56,62 @@ class AdminHandlers:
             return
         
         stats = user_manager.get_stats()
+        dedup = settings_manager.get_dedup_stats()
+        polling = poll_scheduler.get_stats()
+        activity = metrics_summary()
         
         message = (
             "📊 *إحصائيات المستخدمين:*\n\n"
             f"✅ المعتمدين: {stats['approved']}\n"
             f"⏳ في الانتظار: {stats['pending']}\n"
             f"❌ المرفوضين: {stats['rejected']}\n\n"
-            f"📈 إجمالي الطلبات: {stats['approved'] + stats['pending'] + stats['rejected']}"
+            f"📈 إجمالي الطلبات: {stats['approved'] + stats['pending'] + stats['rejected']}\n\n"
+            "🧾 *منع التكرار:*\n"
+            f"المعرفات المحفوظة: {dedup['size']} (مستعادة: {dedup['restored']})\n"
+            f"إرسال مكرر مشتبه بعد إعادة التشغيل: {dedup['suspected_resends']}\n\n"
+            "⏱️ *الفحص التلقائي:*\n"
+            f"مدة الانتظار الحالية: {polling['interval']:.0f} ثانية\n"
+            f"معدل وصول المنشورات: {polling['arrival_rate_per_minute']:.2f} في الدقيقة\n\n"
+            "📈 *الأداء منذ التشغيل:*\n"
+            f"دورات الفحص: {activity['checks']} (متوسط {activity['check_avg_ms']:.0f} ms)\n"
+            f"طلبات الجلب: {activity['fetches']} (متوسط {activity['fetch_avg_ms']:.0f} ms، أخطاء {activity['fetch_errors']})\n"
+            f"متوسط التحليل: {activity['parse_avg_ms']:.1f} ms/صفحة\n"
+            f"منشورات جديدة: {activity['new_posts']}\n"
+            f"رسائل مرسلة: {activity['sent']} (متوسط {activity['send_avg_ms']:.0f} ms، غير ناجحة {activity['send_failures']})"
         )
         
         await update.message.reply_text(message, parse_mode="Markdown")
     
+    async def show_latency(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """عرض زمن وصول التنبيهات (p50/p95/p99) لكل مرحلة"""
+        if not user_manager.is_admin(update.effective_user.id):
+            return
+        
+        labels = {
+            "total": "⏱️ من النشر حتى التسليم",
+            "posted_to_seen": "🔍 من النشر حتى الرصد",
+            "seen_to_rendered": "📝 من الرصد حتى التنسيق",
+            "rendered_to_enqueued": "📮 من التنسيق حتى الطابور",
+            "enqueued_to_delivered": "📤 من الطابور حتى التسليم"
+        }
+        report = latency_tracker.percentiles()
+        
+        if not report["total"]["count"]:
+            await update.message.reply_text("ℹ️ لا توجد تنبيهات مسلّمة بعد لقياس زمن الوصول")
+            return
+        
+        message = "⏱️ *زمن وصول التنبيهات (بالثواني):*\n"
+        for span, label in labels.items():
+            stats = report[span]
+            if not stats["count"]:
+                continue
+            message += (
+                f"\n{label} ({stats['count']} منشور)\n"
+                f"p50: {stats[0.5]:.1f} | p95: {stats[0.95]:.1f} | p99: {stats[0.99]:.1f}\n"
+            )
+        
+        await update.message.reply_text(message, parse_mode="Markdown")
+    
     async def handle_admin_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """معالج استدعاءات الأدمن"""
         query = update.callback_query
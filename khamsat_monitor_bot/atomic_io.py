@@ -0,0 +1,33 @@
+import json
+import os
+import tempfile
+
+def atomic_write_json(path, data):
+    """كتابة ملف JSON بشكل ذري: ملف مؤقت ثم fsync ثم إعادة تسمية
+
+    إذا توقف البرنامج أثناء الكتابة يبقى الملف القديم سليماً.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    # مزامنة المجلد حتى تُحفظ إعادة التسمية نفسها (غير متاح على كل الأنظمة)
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
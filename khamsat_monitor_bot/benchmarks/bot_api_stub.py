@@ -0,0 +1,151 @@
+"""خادم محلي يحاكي Telegram Bot API لاختبارات الحمل
+
+يكفي لـ python-telegram-bot عبر ApplicationBuilder().base_url(f"{stub.base_url}/bot"):
+getMe و sendMessage وأي طريقة أخرى تعيد True. يحاكي تأخير الشبكة وحدود الإرسال
+(429 مع retry_after) عامةً ولكل محادثة، ويسجل كل رسالة مرسلة مع وقت تسليمها.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from urllib.parse import parse_qs
+
+BOT_USER = {"id": 1000000001, "is_bot": True, "first_name": "Khamsat Load Test", "username": "khamsat_load_bot"}
+
+class _Bucket:
+    """دلو رموز: rate في الثانية بسعة burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """استهلاك رمز - يعيد 0 عند النجاح أو الثواني اللازمة حتى يتوفر رمز"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class TelegramStub:
+    """محاكي Bot API: تأخير latency±jitter، و429 عند تجاوز الحدود أو بنسبة عشوائية"""
+
+    def __init__(self, latency=0.05, jitter=0.5, global_rate=30, global_burst=30,
+                 per_chat_rate=1, per_chat_burst=3, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.global_bucket = _Bucket(global_rate, global_burst)
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.error_rate = error_rate
+        self.sent = []  # [(وقت التسليم unix، chat_id، النص)]
+        self.stats = {"requests": 0, "sent": 0, "rate_limited": 0, "random_rate_limited": 0}
+        self._chat_buckets = {}
+        self._rng = random.Random(seed)
+        self._message_id = 0
+        self._server = None
+        self.port = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        """خدمة طلبات POST /bot<token>/<method> مع keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+
+                self.stats["requests"] += 1
+                target = request_line.decode("latin-1").split()[1]
+                method = target.rstrip("/").rsplit("/", 1)[-1]
+                params = {name: values[0] for name, values in parse_qs(body.decode("utf-8")).items()}
+
+                if self.latency:
+                    await asyncio.sleep(self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter))
+                status, payload = self._respond(method, params)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method, params):
+        """(الحالة، JSON) لاستدعاء واحد"""
+        if method == "getMe":
+            return "200 OK", {"ok": True, "result": BOT_USER}
+        if method != "sendMessage":
+            return "200 OK", {"ok": True, "result": True}
+
+        chat_id = int(params.get("chat_id", 0))
+        wait = self._rate_limit(chat_id)
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            return "429 Too Many Requests", {
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }
+
+        text = params.get("text", "")
+        self.sent.append((time.time(), chat_id, text))
+        self.stats["sent"] += 1
+        self._message_id += 1
+        return "200 OK", {"ok": True, "result": {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+        }}
+
+    def _rate_limit(self, chat_id):
+        """الثواني المطلوب انتظارها إذا رُفضت الرسالة (0 = مقبولة)"""
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.stats["random_rate_limited"] += 1
+            self.stats["rate_limited"] += 1
+            return 1.0
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = _Bucket(self.per_chat_rate, self.per_chat_burst)
+        wait = bucket.take() or self.global_bucket.take()
+        if wait:
+            self.stats["rate_limited"] += 1
+        return wait
@@ -0,0 +1,88 @@
+"""توليد صفحات طلبات خمسات اصطناعية بنفس بنية /community/requests
+
+ملفات benchmarks/fixtures/*.html اصطناعية أيضاً وليست صفحات محفوظة من الموقع.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from html import escape
+
+SAMPLE_TITLES = [
+    "مطلوب مصمم شعار لمتجر إلكتروني",
+    "كتابة مقالات سيو لمدونة تقنية",
+    "تطوير موقع ووردبريس مع متجر",
+    "مونتاج فيديو قصير لتيك توك",
+    "إدارة حسابات سوشيال ميديا وحملات ممولة",
+    "ترجمة ملف PDF من الإنجليزية للعربية",
+    "تصميم داخلي لشقة سكنية - أوتوكاد",
+    "تعليق صوتي لإعلان مدته دقيقة",
+    "حل واجبات رياضيات لطالب جامعي",
+    "إدخال بيانات في جدول اكسل",
+    "برمجة بوت تليجرام بلغة بايثون",
+    "Need a Frontend developer (React + API)",
+    "مطلوب شخص لمهمة بسيطة",
+    "تصميم *بوستات* انستقرام [عاجل]",
+    "كتابة سيناريو_فيديو موشن جرافيك",
+    "دراسة جدوى & خطة عمل لمشروع مطعم",
+    "استشارة في الطبخ الصحي وتخسيس",
+    "<تحليل> بيانات المبيعات باستخدام SQL",
+]
+
+SAMPLE_USERS = ["أحمد م.", "sara_dev", "محمد_ع", "Khaled *K*", "نورة", "user[1]"]
+
+def make_post(post_id, posted_at, rng, now=None):
+    """منشور اصطناعي واحد بعنوان ومستخدم عشوائيين"""
+    now = now or posted_at
+    minutes = int((now - posted_at).total_seconds() // 60)
+    return {
+        "id": post_id,
+        "title": rng.choice(SAMPLE_TITLES),
+        "username": rng.choice(SAMPLE_USERS),
+        "timestamp": posted_at.strftime("%d/%m/%Y %H:%M:%S") + " GMT",
+        "time_text": f"منذ {minutes} دقيقة" if minutes else "منذ ثوانٍ",
+    }
+
+def generate_posts(count, start_id=700000, now=None, spacing_seconds=45, seed=0):
+    """توليد قائمة منشورات مرتبة من الأحدث للأقدم"""
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    return [
+        make_post(start_id - i, now - timedelta(seconds=i * spacing_seconds), rng, now)
+        for i in range(count)
+    ]
+
+def render_row(post):
+    """صف منشور واحد بنفس عناصر الصفحة الحقيقية"""
+    return (
+        f'<tr class="forum_post" id="forum_post-{post["id"]}">\n'
+        f'  <td class="avatar-td"><img src="/avatar/{post["id"]}.png" class="avatar" alt=""></td>\n'
+        f'  <td class="details-td">\n'
+        f'    <h3 class="details-head"><a href="/community/requests/{post["id"]}" class="ajaxbtn">\n'
+        f'      {escape(post["title"])}\n'
+        f'    </a></h3>\n'
+        f'    <ul class="details-list list-inline">\n'
+        f'      <li class="list-inline-item"><a class="user" href="/user/u{post["id"]}">'
+        f'<i class="fa fa-user"></i> {escape(post["username"])}</a></li>\n'
+        f'      <li class="d-lg-inline-block list-inline-item"><i class="fa fa-clock-o"></i> '
+        f'<span dir="ltr" title="{post["timestamp"]}">{escape(post["time_text"])}</span></li>\n'
+        f'    </ul>\n'
+        f'  </td>\n'
+        f'  <td class="comments-td"><span class="badge">{post["id"] % 7}</span> تعليق</td>\n'
+        f'</tr>\n'
+    )
+
+def render_listing(posts, page=1, has_next=True):
+    """صفحة طلبات كاملة (رأس وجدول وترقيم صفحات)"""
+    rows = "".join(render_row(post) for post in posts)
+    next_link = f'<a class="next" href="/community/requests?page={page + 1}">التالي</a>' if has_next else ""
+    return (
+        '<!DOCTYPE html>\n<html lang="ar" dir="rtl"><head><meta charset="utf-8">'
+        '<title>طلبات الخدمات | خمسات</title>'
+        '<link rel="stylesheet" href="/css/app.css"><script>var page = 1;</script></head>\n'
+        '<body><header class="navbar"><nav><ul><li><a href="/">الرئيسية</a></li>'
+        '<li><a href="/community">المجتمع</a></li></ul></nav></header>\n'
+        '<div class="container"><table class="table forum_table"><tbody>\n'
+        f'{rows}'
+        '</tbody></table>\n'
+        f'<div class="pagination">{next_link}</div></div>\n'
+        '<footer><p>&copy; خمسات</p></footer></body></html>\n'
+    )
@@ -0,0 +1,203 @@
+"""قياس المسار الساخن لدورة الفحص دون الاتصال بخمسات
+
+يشغّل محاكياً محلياً لصفحات الطلبات ويقيس الجلب والتحليل والتصنيف والتصفية
+والتنسيق لأحجام مختلفة، ثم يكتب النتائج بصيغة JSON.
+
+التشغيل من مجلد البوت:
+    python -m benchmarks.hot_path [--runs 20] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.fixtures import generate_posts, render_listing
+from benchmarks.stub_server import KhamsatStub, run_in_thread
+
+POST_COUNTS = (10, 100, 1000)
+SUBSCRIBER_COUNTS = (1, 10, 100, 1000, 10000)
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def measure(func, runs, setup=None):
+    """تشغيل func عدة مرات وإرجاع إحصائيات الزمن بالملّي ثانية"""
+    timings = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "runs": runs,
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "min_ms": round(timings[0], 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+    }
+
+def random_selections(count, category_names, seed=0):
+    """اختيارات فئات عشوائية لعدد من المشتركين (بعضهم كل الفئات أو لا شيء)"""
+    rng = random.Random(seed)
+    selections = {}
+    for user_id in range(1, count + 1):
+        kind = rng.random()
+        if kind < 0.3:
+            selections[user_id] = []
+        elif kind < 0.35:
+            selections[user_id] = ["__none__"]
+        else:
+            selections[user_id] = rng.sample(category_names, rng.randint(1, 4))
+    return selections
+
+def bench_fetch(stub, runs, results):
+    """الجلب عبر المحاكي: غلاف fetch_posts المتزامن، والعميل المشترك بصفحة جديدة أو غير متغيرة"""
+    import scraper
+
+    loop = asyncio.new_event_loop()
+    try:
+        for count in POST_COUNTS:
+            stub.set_posts(generate_posts(count))
+            stub.page_size = count
+
+            results.append({"name": "fetch_posts", "posts": count,
+                            **measure(scraper.fetch_posts, runs, setup=scraper._page_states.clear)})
+            results.append({"name": "fetch_listing.changed", "posts": count,
+                            **measure(lambda: loop.run_until_complete(scraper.fetch_listing()), runs,
+                                      setup=scraper._page_states.clear)})
+            loop.run_until_complete(scraper.fetch_listing())
+            results.append({"name": "fetch_listing.unchanged", "posts": count,
+                            **measure(lambda: loop.run_until_complete(scraper.fetch_listing()), runs)})
+
+        # صفحات الاختبار الاصطناعية الثابتة كما هي
+        for path in sorted(os.listdir(FIXTURES_DIR)):
+            if not path.endswith(".html"):
+                continue
+            with open(os.path.join(FIXTURES_DIR, path), encoding="utf-8") as f:
+                stub.pages = {1: f.read()}
+            results.append({"name": f"fetch_listing.fixture:{path}",
+                            **measure(lambda: loop.run_until_complete(scraper.fetch_listing()), runs,
+                                      setup=scraper._page_states.clear)})
+        stub.pages = {}
+    finally:
+        loop.run_until_complete(scraper.close_http_client())
+        loop.close()
+
+def bench_extract(runs, results):
+    """استخراج المنشورات (extract_post_data لمحركات BeautifulSoup و build_post للمحرك المتدفق)"""
+    from scraper import extract_posts
+    from categories import _classification_cache
+
+    for count in POST_COUNTS:
+        html = render_listing(generate_posts(count))
+        for backend in ("html.parser", "stream"):
+            results.append({"name": f"extract_posts.{backend}", "posts": count,
+                            **measure(lambda: extract_posts(html, backend, limit=None), runs,
+                                      setup=_classification_cache.clear)})
+
+def bench_classify(runs, results):
+    """تصنيف العناوين بذاكرة فارغة ثم ممتلئة"""
+    from categories import classify_post, _classification_cache
+
+    for count in POST_COUNTS:
+        posts = generate_posts(count)
+        items = [(post["title"], f"forum_post-{post['id']}") for post in posts]
+
+        def classify_all():
+            for title, post_id in items:
+                classify_post(title, post_id)
+
+        results.append({"name": "classify_post.cold", "posts": count,
+                        **measure(classify_all, runs, setup=_classification_cache.clear)})
+        classify_all()
+        results.append({"name": "classify_post.warm", "posts": count, **measure(classify_all, runs)})
+
+def bench_filter(runs, results):
+    """توزيع المنشورات على المشتركين: تصفية لكل مستخدم مقابل فهرس الاشتراكات"""
+    from scraper import extract_posts
+    from categories import CATEGORY_NAMES
+    from post_filter import filter_posts_by_selection
+    from subscription_index import SubscriptionIndex
+
+    for count in POST_COUNTS:
+        posts = extract_posts(render_listing(generate_posts(count)), "stream", limit=None)
+        for subscribers in SUBSCRIBER_COUNTS:
+            selections = random_selections(subscribers, CATEGORY_NAMES)
+            index = SubscriptionIndex()
+            index.load(selections)
+            # الأحجام الكبيرة مكلفة، فيكفي عدد أقل من التكرارات
+            scaled_runs = max(1, runs // max(1, (count * subscribers) // 100000))
+
+            def per_user():
+                for selection in selections.values():
+                    filter_posts_by_selection(posts, selection)
+
+            results.append({"name": "filter_posts_by_category.per_user", "posts": count,
+                            "subscribers": subscribers, **measure(per_user, scaled_runs)})
+            results.append({"name": "subscription_index.route", "posts": count, "subscribers": subscribers,
+                            **measure(lambda: index.route(posts, selections.keys()), scaled_runs)})
+
+def bench_format(runs, results):
+    """تنسيق التنبيهات والقوائم مع ذاكرة أجزاء فارغة ثم ممتلئة"""
+    import formatter
+    from scraper import extract_posts
+
+    for count in POST_COUNTS:
+        posts = extract_posts(render_listing(generate_posts(count)), "stream", limit=None)
+        results.append({"name": "format.alert.cold", "posts": count,
+                        **measure(lambda: formatter.format_new_posts_alert(posts), runs,
+                                  setup=formatter._fragments.clear)})
+        results.append({"name": "format.alert.warm", "posts": count,
+                        **measure(lambda: formatter.format_new_posts_alert(posts), runs)})
+        results.append({"name": "format.list.warm", "posts": count,
+                        **measure(lambda: formatter.format_posts_list(posts), runs)})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--output", help="ملف JSON للنتائج (الافتراضي: الطباعة)")
+    args = parser.parse_args(argv)
+
+    stub = KhamsatStub()
+    stop_stub = run_in_thread(stub)
+    # يجب ضبط الرابط قبل استيراد وحدات البوت لأن config تقرؤه عند الاستيراد
+    os.environ["KHAMSAT_BASE_URL"] = stub.base_url
+    logging.disable(logging.ERROR)
+
+    results = []
+    try:
+        bench_fetch(stub, args.runs, results)
+        bench_extract(args.runs, results)
+        bench_classify(args.runs, results)
+        bench_filter(args.runs, results)
+        bench_format(args.runs, results)
+    finally:
+        stop_stub()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+            "stub_requests": stub.requests,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"✅ تم حفظ {len(results)} نتيجة في {args.output}")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""اختبار حمل لحلقة المراقبة ومعالج الأزرار مع محاكيين محليين لخمسات و Bot API
+
+يشغّل PostMonitor.monitor_loop وطابور الإرسال الحقيقيين ضد محاكي خمسات ينشر
+منشورات بمعدل محدد، ويرسل ضغطات أزرار من آلاف المستخدمين عبر handle_buttons،
+ثم يقيس معدل الإرسال وزمن وصول التنبيهات من لحظة النشر حتى التسليم.
+
+كل الملفات (الإعدادات والمستخدمين والسجل) تُكتب في مجلد مؤقت.
+
+التشغيل من مجلد البوت:
+    python -m benchmarks.load_test [--users 2000] [--duration 60] [--post-rate 0.2]
+                                   [--actions-rate 20] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BOT_DIR)
+
+from benchmarks.fixtures import generate_posts
+from benchmarks.stub_server import KhamsatStub, run_in_thread
+from benchmarks.bot_api_stub import TelegramStub
+
+BOT_TOKEN = "123456:LOAD-TEST"
+POST_LINK_RE = re.compile(r"/community/requests/(\d+)")
+
+# أزرار المستخدمين وأوزانها (إيقاف الرصد يوقف تنبيهات المستخدم نفسه فقط)
+USER_ACTIONS = (
+    ("📋 عرض الطلبات الجديدة", 5),
+    ("🏷️ اختيار الفئات", 2),
+    ("🧭 عرض الأوامر", 2),
+    ("🚨 تفعيل الرصد التلقائي", 1),
+    ("⛔️ إيقاف الرصد", 1),
+    ("نص عشوائي", 1),
+)
+
+def summarize(values):
+    """عدد ومتوسط ونسب مئوية لقائمة أزمنة بالثواني"""
+    from latency import percentile
+
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 4),
+        "p50": round(percentile(values, 0.5), 4),
+        "p95": round(percentile(values, 0.95), 4),
+        "p99": round(percentile(values, 0.99), 4),
+        "max": round(values[-1], 4),
+    }
+
+def prepare_data_dir(path, user_ids, seed):
+    """ملفات مستخدمين وإعدادات جاهزة: كل المستخدمين معتمدون، وفئات عشوائية، والرصد مفعّل"""
+    from categories import CATEGORY_NAMES
+    from benchmarks.hot_path import random_selections
+
+    selections = random_selections(len(user_ids), CATEGORY_NAMES, seed=seed)
+    users = {"approved_users": list(user_ids), "pending_users": {}, "rejected_users": []}
+    settings = {
+        "monitoring_active": True,
+        "last_sent_ids": [],
+        "last_seen_post": None,
+        "user_categories": {str(user_id): selections[i] for i, user_id in enumerate(user_ids, 1)},
+    }
+    for name, document in (("bot_users.json", users), ("bot_settings.json", settings)):
+        with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False)
+
+def make_update(update_id, user_id, text):
+    """تحديث رسالة نصية بصيغة Bot API"""
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return {"update_id": update_id, "message": message}
+
+async def drive_users(app, user_ids, stranger_ids, rate, duration, seed):
+    """ضغطات أزرار بمعدل rate في الثانية - تعيد زمن معالجة كل تحديث"""
+    from telegram import Update
+
+    rng = random.Random(seed)
+    texts, weights = zip(*USER_ACTIONS)
+    timings, tasks = [], []
+
+    async def process(data):
+        start = time.perf_counter()
+        await app.process_update(Update.de_json(data, app.bot))
+        timings.append(time.perf_counter() - start)
+
+    deadline = time.monotonic() + duration
+    update_id = 0
+    while time.monotonic() < deadline:
+        await asyncio.sleep(rng.expovariate(rate))
+        update_id += 1
+        if stranger_ids and rng.random() < 0.05:
+            # مستخدم غير معتمد: يمر بنظام التحكم في الوصول
+            data = make_update(update_id, rng.choice(stranger_ids), "/start")
+        else:
+            data = make_update(update_id, rng.choice(user_ids), rng.choices(texts, weights)[0])
+        tasks.append(asyncio.create_task(process(data)))
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return timings
+
+def alert_delays(telegram, published, subscribers):
+    """زمن وصول كل منشور: لأول مستخدم ولآخر مستخدم، والمنشورات التي لم تصل لأحد"""
+    deliveries = {}  # {رقم المنشور: [أوقات التسليم]}
+    for delivered_at, chat_id, text in telegram.sent:
+        if chat_id not in subscribers:
+            continue
+        for match in set(POST_LINK_RE.findall(text)):
+            post_id = int(match)
+            if post_id in published:
+                deliveries.setdefault(post_id, []).append(delivered_at)
+
+    first = [min(times) - published[post_id] for post_id, times in deliveries.items()]
+    last = [max(times) - published[post_id] for post_id, times in deliveries.items()]
+    per_user = [t - published[post_id] for post_id, times in deliveries.items() for t in times]
+    return {
+        "published": len(published),
+        "alerted": len(deliveries),
+        "missed": sorted(set(published) - set(deliveries)),
+        "first_delivery": summarize(first),
+        "last_delivery": summarize(last),
+        "per_user_delivery": summarize(per_user),
+    }
+
+async def run(args, khamsat, telegram, user_ids):
+    """تشغيل البوت داخل حلقة الأحداث الحالية وجمع النتائج"""
+    from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
+    from handlers import start, help_command, handle_buttons
+    from monitor import PostMonitor
+    from send_queue import send_queue
+    from post_cache import post_cache
+    from scheduler import poll_scheduler
+    from scraper import close_http_client
+    from settings_manager import settings_manager
+    from latency import latency_tracker
+
+    handler_errors = []
+
+    async def on_error(update, context):
+        handler_errors.append(type(context.error).__name__)
+
+    app = ApplicationBuilder().token(BOT_TOKEN).base_url(f"{telegram.base_url}/bot").build()
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_buttons))
+    app.add_error_handler(on_error)
+    await app.initialize()
+
+    # فحص أسرع من الإعداد الافتراضي حتى تكفي مدة الاختبار القصيرة
+    poll_scheduler.min_interval = args.poll_min
+    poll_scheduler.interval = args.poll_min
+    post_cache.ttl = min(post_cache.ttl, args.poll_min)
+
+    send_queue.start(app.bot)
+    monitor = PostMonitor()
+    monitor_task = asyncio.create_task(monitor.monitor_loop(app))
+
+    stranger_ids = list(range(9000001, 9000001 + max(1, args.users // 20)))
+    started = time.monotonic()
+    # الأدمن (أول القائمة) مستبعد لأن إيقافه للرصد يوقفه للجميع
+    handler_timings = await drive_users(app, user_ids[1:], stranger_ids, args.actions_rate, args.duration, args.seed)
+    khamsat.stop_feed()
+
+    # انتظار تفريغ طابور الإرسال وتأكيد التسليم
+    drain_deadline = time.monotonic() + args.drain
+    while time.monotonic() < drain_deadline and (send_queue.pending() or monitor.in_flight_ids):
+        await asyncio.sleep(0.5)
+    elapsed = time.monotonic() - started
+
+    monitor_task.cancel()
+    await asyncio.gather(monitor_task, return_exceptions=True)
+    await send_queue.stop()
+    await close_http_client()
+    await app.shutdown()
+    settings_manager.flush()
+
+    subscribers = set(user_ids)
+    alerts = alert_delays(telegram, dict(khamsat.published), subscribers)
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "drained": not (send_queue.pending() or monitor.in_flight_ids),
+        "handlers": {
+            "updates": len(handler_timings),
+            "per_second": round(len(handler_timings) / args.duration, 2),
+            "errors": len(handler_errors),
+            "error_types": sorted(set(handler_errors)),
+            "seconds": summarize(handler_timings),
+        },
+        "alerts": alerts,
+        "bot_latency": {name: {str(k): v for k, v in spans.items()}
+                        for name, spans in latency_tracker.percentiles().items()},
+        "send_queue": dict(send_queue.stats),
+        "telegram": {**telegram.stats, "messages_per_second": round(telegram.stats["sent"] / elapsed, 2)},
+        "khamsat_requests": khamsat.requests,
+        "dead_letters": len(send_queue.load_dead_letters()),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000, help="عدد المستخدمين المعتمدين (مع الأدمن)")
+    parser.add_argument("--duration", type=float, default=60, help="مدة توليد المنشورات والضغطات (ثانية)")
+    parser.add_argument("--post-rate", type=float, default=0.2, help="منشورات جديدة في الثانية")
+    parser.add_argument("--actions-rate", type=float, default=20, help="ضغطات أزرار في الثانية")
+    parser.add_argument("--poll-min", type=float, default=2, help="أقل مدة بين دورات الفحص (ثانية)")
+    parser.add_argument("--drain", type=float, default=300, help="أقصى انتظار لتفريغ طابور الإرسال (ثانية)")
+    parser.add_argument("--latency", type=float, default=0.05, help="متوسط تأخير Bot API (ثانية)")
+    parser.add_argument("--global-rate", type=float, default=30, help="حد Bot API العام (رسالة/ثانية)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="نسبة 429 العشوائية")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="إظهار سجلات البوت")
+    parser.add_argument("--output", help="ملف JSON للنتائج (الافتراضي: الطباعة)")
+    args = parser.parse_args(argv)
+
+    # منشورات قديمة فقط في البداية حتى لا تُحتسب كتنبيهات
+    initial = generate_posts(25, start_id=700000, now=datetime.now(timezone.utc) - timedelta(minutes=30))
+    khamsat = KhamsatStub(initial, post_rate=args.post_rate, seed=args.seed)
+    telegram = TelegramStub(latency=args.latency, global_rate=args.global_rate,
+                            global_burst=args.global_rate, error_rate=args.error_rate, seed=args.seed)
+    stop_khamsat = run_in_thread(khamsat)
+    stop_telegram = run_in_thread(telegram)
+
+    # يجب ضبط البيئة ومجلد العمل قبل استيراد وحدات البوت (config يقرؤها عند الاستيراد)
+    data_dir = tempfile.mkdtemp(prefix="khamsat_load_")
+    os.chdir(data_dir)
+    os.environ.update({
+        "BOT_TOKEN": BOT_TOKEN,
+        "KHAMSAT_BASE_URL": khamsat.base_url,
+        "METRICS_PORT": "0",
+        "STORAGE_BACKEND": "json",
+    })
+    os.environ.pop("DEDUP_LOG_FILE", None)
+    if not args.verbose:
+        logging.disable(logging.WARNING)
+
+    from config import ALLOWED_USER_ID
+    user_ids = [ALLOWED_USER_ID] + list(range(5000001, 5000001 + args.users - 1))
+    prepare_data_dir(data_dir, user_ids, args.seed)
+
+    try:
+        report = asyncio.run(run(args, khamsat, telegram, user_ids))
+    finally:
+        stop_khamsat()
+        stop_telegram()
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "users": args.users,
+            "duration": args.duration,
+            "post_rate": args.post_rate,
+            "actions_rate": args.actions_rate,
+            "poll_min": args.poll_min,
+            "telegram_latency": args.latency,
+            "telegram_global_rate": args.global_rate,
+            "telegram_error_rate": args.error_rate,
+            "data_dir": data_dir,
+        },
+        **report,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"✅ تم حفظ النتائج في {args.output}")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""قياس زمن تحليل صفحة الطلبات لكل محرك تحليل
+
+التشغيل من مجلد البوت:
+    python -m benchmarks.parse_backends [--runs 50] [ملفات HTML ...]
+
+تطابق نتائج المحركات على نفس الملفات والحالات المعطوبة يُفحص في tests/test_parse_backends.py.
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+from scraper import extract_posts
+
+BACKENDS = ["html.parser", "strainer", "lxml", "stream"]
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def time_backend(html, backend, runs):
+    """متوسط زمن تحليل صفحة واحدة بالملّي ثانية"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        extract_posts(html, backend)
+    return (time.perf_counter() - start) / runs * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="ملفات HTML (الافتراضي: الصفحات الاصطناعية في benchmarks/fixtures)")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    # أخطاء الصفوف المعطوبة في الملفات متوقعة ولا داعي لطباعتها مع كل تكرار
+    logging.disable(logging.ERROR)
+
+    files = args.files or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+    backends = BACKENDS
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        # بدون lxml يرجع المحرك لـ html.parser فتكون أرقامه مضللة
+        print("⚠️ مكتبة lxml غير مثبتة (pip install -r requirements.txt) - تم استبعاد محرك lxml")
+        backends = [backend for backend in BACKENDS if backend != "lxml"]
+
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        print(f"{os.path.basename(path)} ({len(html) // 1024} KB)")
+
+        for backend in backends:
+            print(f"  {backend:<12} {time_backend(html, backend, args.runs):8.2f} ms/صفحة")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
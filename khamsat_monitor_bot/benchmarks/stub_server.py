@@ -0,0 +1,167 @@
+"""خادم HTTP محلي يحاكي صفحات /community/requests من منشورات أو ملفات HTML ثابتة
+
+لا يعتمد على مكتبات خارجية (asyncio فقط) حتى يعمل في أي بيئة قياس.
+"""
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+
+from benchmarks.fixtures import make_post, render_listing
+
+REQUESTS_PATH = "/community/requests"
+
+class KhamsatStub:
+    """محاكي خمسات: يقسم المنشورات على صفحات أو يعيد صفحات HTML ثابتة كما هي
+
+    مع post_rate > 0 تُضاف منشورات جديدة أعلى الصفحة الأولى بفواصل عشوائية
+    (عملية بواسون بمتوسط post_rate منشور في الثانية) طوال مدة التشغيل.
+    """
+
+    def __init__(self, posts=None, page_size=25, pages=None, post_rate=0.0, max_posts=250, seed=0):
+        self.page_size = page_size
+        self.posts = list(posts or [])
+        self.pages = dict(pages or {})  # {رقم الصفحة: HTML ثابت} له الأولوية على posts
+        self.post_rate = post_rate
+        self.max_posts = max_posts
+        self.published = {}  # {رقم المنشور: وقت نشره (unix)} للمنشورات المولدة أثناء التشغيل
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._feed_task = None
+        self._loop = None
+        self._server = None
+        self.port = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def set_posts(self, posts):
+        """استبدال المنشورات المعروضة (من الأحدث للأقدم)"""
+        self.posts = list(posts)
+
+    def publish(self, count=1):
+        """نشر منشورات جديدة الآن أعلى القائمة - تعيد أرقامها"""
+        now = datetime.now(timezone.utc)
+        next_id = max((post["id"] for post in self.posts), default=700000) + 1
+        new_posts = [make_post(next_id + i, now, self._rng) for i in range(count)]
+        published_at = time.time()
+        for post in new_posts:
+            self.published[post["id"]] = published_at
+        self.posts[:0] = reversed(new_posts)
+        del self.posts[self.max_posts:]
+        return [post["id"] for post in new_posts]
+
+    async def _feed(self):
+        """توليد المنشورات بمعدل post_rate حتى الإيقاف"""
+        while True:
+            await asyncio.sleep(self._rng.expovariate(self.post_rate))
+            self.publish()
+
+    def render_page(self, page):
+        """HTML صفحة معينة - None إذا كانت خارج النطاق"""
+        if page in self.pages:
+            return self.pages[page]
+        start = (page - 1) * self.page_size
+        if page < 1 or (start >= len(self.posts) and page > 1):
+            return None
+        rows = self.posts[start:start + self.page_size]
+        return render_listing(rows, page, has_next=start + self.page_size < len(self.posts))
+
+    async def start(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.post_rate > 0:
+            self._loop = asyncio.get_running_loop()
+            self._feed_task = self._loop.create_task(self._feed())
+        return self
+
+    def stop_feed(self):
+        """إيقاف توليد المنشورات مع إبقاء الخادم يعمل (آمن من أي خيط)"""
+        if self._feed_task is not None:
+            self._loop.call_soon_threadsafe(self._feed_task.cancel)
+            self._feed_task = None
+
+    async def stop(self):
+        self.stop_feed()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        """خدمة طلبات GET مع keep-alive ودعم If-None-Match"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                method, target = request_line.decode("latin-1").split()[:2]
+                status, body, extra = self._respond(method, target, headers)
+                head = f"HTTP/1.1 {status}\r\nContent-Length: {len(body)}\r\n"
+                head += "Content-Type: text/html; charset=utf-8\r\n"
+                head += "".join(f"{name}: {value}\r\n" for name, value in extra.items())
+                writer.write(head.encode("latin-1") + b"\r\n" + body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method, target, headers):
+        """(الحالة، المحتوى، رؤوس إضافية) لطلب واحد"""
+        url = urlsplit(target)
+        if method != "GET" or url.path != REQUESTS_PATH:
+            return "404 Not Found", b"", {}
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        html = self.render_page(page)
+        if html is None:
+            return "404 Not Found", b"", {}
+        body = html.encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if headers.get("if-none-match") == etag:
+            return "304 Not Modified", b"", {"ETag": etag}
+        return "200 OK", body, {"ETag": etag}
+
+def run_in_thread(stub, host="127.0.0.1", port=0):
+    """تشغيل المحاكي في خيط مستقل بحلقة أحداث خاصة - تعيد دالة الإيقاف"""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(stub.start(host, port))
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    ready.wait()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(stub.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    return stop
@@ -1,3 +1,9 @@
+from collections import deque
+from config import logger, CLASSIFY_CACHE_SIZE
+from lru import LRUCache, MISSING
+from metrics import CLASSIFY_SECONDS, CLASSIFY_LOOKUPS
+from profiler import profiler
+
 CATEGORIES = {
     "تصميم": {
         "icon": "🎨",
@@ -96,19 +102,167 @@ CATEGORIES = {
     }
 }
 
-def classify_post(title):
-    """تصنيف المنشور بناءً على العنوان"""
-    title_lower = title.lower()
-    matched_categories = []
+class KeywordMatcher:
+    """مُطابق متعدد الكلمات (Aho-Corasick) يجد كل الفئات في مرور واحد على العنوان"""
+
+    def __init__(self, categories):
+        # ترتيب الفئات هنا هو ترتيب النتائج (نفس ترتيب CATEGORIES)
+        self.names = [name for name in categories if name != "أخرى"]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [0]  # قناع بتات الفئات التي تنتهي كلماتها عند كل حالة
+        self._always = 0  # فئات فيها كلمة فارغة (تطابق أي عنوان)
+
+        for index, name in enumerate(self.names):
+            for keyword in categories[name]["keywords"]:
+                self._add(keyword.lower(), 1 << index)
+        self._build_failure_links()
+
+    def _add(self, keyword, bit):
+        """إضافة كلمة إلى الشجرة"""
+        if not keyword:
+            self._always |= bit
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(0)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._out[state] |= bit
+
+    def _build_failure_links(self):
+        """بناء روابط الفشل بالعرض ودمج مخرجات اللواحق"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] |= self._out[self._fail[next_state]]
+                queue.append(next_state)
+
+    def match_mask(self, text):
+        """قناع بتات كل الفئات التي تظهر إحدى كلماتها في النص"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        mask = self._always
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            mask |= out[state]
+        return mask
+
+    def match(self, text, limit=3):
+        """أسماء الفئات المطابقة بترتيب CATEGORIES (بحد أقصى limit)"""
+        mask = self.match_mask(text)
+        matched = []
+        index = 0
+        while mask and len(matched) < limit:
+            if mask & 1:
+                matched.append(self.names[index])
+            mask >>= 1
+            index += 1
+        return matched
+
+def _table_fingerprint(categories):
+    """بصمة جدول الفئات: الأسماء بترتيبها مع الأيقونات والكلمات المفتاحية"""
+    return hash(tuple((name, info["icon"], tuple(info["keywords"])) for name, info in categories.items()))
+
+_matcher = KeywordMatcher(CATEGORIES)
+_fingerprint = _table_fingerprint(CATEGORIES)
+_reload_listeners = []
+# نتائج التصنيف بمفتاح (معرف المنشور، بصمة العنوان)
+_classification_cache = LRUCache(CLASSIFY_CACHE_SIZE)
+
+# جدول الفئات المُعرّف: لكل فئة بت ثابت، والقناع يمثل مجموعة فئات بعدد صحيح واحد
+CATEGORY_NAMES = []
+_category_bits = {}
+_names_by_mask = {}
+
+def _build_category_table():
+    """بناء جدول البتات بترتيب CATEGORIES"""
+    CATEGORY_NAMES[:] = list(CATEGORIES)
+    _category_bits.clear()
+    _category_bits.update({name: 1 << index for index, name in enumerate(CATEGORY_NAMES)})
+    _names_by_mask.clear()
+
+_build_category_table()
+
+def category_mask(names):
+    """قناع بتات مجموعة فئات (الأسماء غير المعروفة تُتجاهل)"""
+    mask = 0
+    for name in names:
+        mask |= _category_bits.get(name, 0)
+    return mask
+
+def category_names(mask):
+    """أسماء الفئات في القناع بترتيب CATEGORIES (tuple مشتركة لكل قناع)"""
+    names = _names_by_mask.get(mask)
+    if names is None:
+        names = tuple(name for name in CATEGORY_NAMES if mask & _category_bits[name])
+        _names_by_mask[mask] = names
+    return names
+
+def reload_categories(categories=None):
+    """إعادة بناء المُطابق بعد تعديل جدول الفئات وإبطال نتائج التصنيف المخزنة"""
+    global _matcher, _fingerprint
+    if categories is not None and categories is not CATEGORIES:
+        CATEGORIES.clear()
+        CATEGORIES.update(categories)
+    _matcher = KeywordMatcher(CATEGORIES)
+    _fingerprint = _table_fingerprint(CATEGORIES)
+    _classification_cache.clear()
+    _build_category_table()
+    for listener in _reload_listeners:
+        listener()
+
+def refresh_categories():
+    """إعادة البناء تلقائياً إذا عُدّل جدول الفئات منذ آخر بناء - تعيد True عند التغيير
+
+    تُستدعى مرة لكل صفحة تُحلل وعند كل إخفاق في الذاكرة (قبل استخدام المُطابق)،
+    فلا تُضاف تكلفة البصمة للإصابات.
+    """
+    if _table_fingerprint(CATEGORIES) == _fingerprint:
+        return False
+    logger.info("🔄 تغير جدول الفئات - إعادة بناء المُطابق وإبطال نتائج التصنيف")
+    reload_categories()
+    return True
+
+def add_reload_listener(listener):
+    """تسجيل دالة تُستدعى بعد إعادة بناء جدول الفئات (لإبطال ذاكرات تعتمد عليه)"""
+    _reload_listeners.append(listener)
+
+def get_classification_stats():
+    """إحصائيات ذاكرة التصنيف (إصابات/إخفاقات/الحجم)"""
+    return _classification_cache.stats()
+
+def classify_post(title, post_id=None):
+    """تصنيف المنشور بناءً على العنوان (مع ذاكرة مؤقتة إذا عُرف معرف المنشور)"""
+    if post_id:
+        key = (post_id, hash(title))
+        cached = _classification_cache.get(key)
+        if cached is not MISSING:
+            CLASSIFY_LOOKUPS.inc(cache="hit")
+            return list(cached)
     
-    for category, data in CATEGORIES.items():
-        if category == "أخرى":
-            continue
-        
-        for keyword in data["keywords"]:
-            if keyword.lower() in title_lower:
-                if category not in matched_categories:
-                    matched_categories.append(category)
-                break
+    CLASSIFY_LOOKUPS.inc(cache="miss")
+    refresh_categories()
+    with CLASSIFY_SECONDS.time(), profiler.span("classify"):
+        matched_categories = _matcher.match(title) or ["أخرى"]
     
-    return matched_categories[:3] if matched_categories else ["أخرى"]
+    if post_id:
+        _classification_cache.put(key, tuple(matched_categories))
+    return matched_categories
+
+def classify_post_mask(title, post_id=None):
+    """تصنيف المنشور كقناع بتات على جدول الفئات"""
+    return category_mask(classify_post(title, post_id))
@@ -13,6 +13,75 @@ ALLOWED_USER_ID = 267112556
 MONITORING_INTERVAL = 30  # ثانية
 MAX_POST_AGE_MINUTES = 3  # دقائق
 
+# جدولة الفحص التكيفية (تبدأ من MONITORING_INTERVAL)
+POLL_MIN_INTERVAL = 10  # ثانية
+POLL_MAX_INTERVAL = 180  # ثانية
+POLL_TARGET_POSTS = 0.5  # متوسط عدد المنشورات المستهدف لكل دورة فحص
+POLL_QUIET_BACKOFF = 1.5  # معامل الإبطاء عند الهدوء (والتسريع عند النشاط)
+POLL_RATE_WINDOW = 900  # ثانية - نافذة حساب معدل وصول المنشورات
+POLL_JITTER = 0.1  # نسبة العشوائية في مدة الانتظار
+
+# إعدادات الجلب
+KHAMSAT_BASE_URL = os.getenv("KHAMSAT_BASE_URL", "https://khamsat.com")
+REQUESTS_PATH = "/community/requests"
+FETCH_TIMEOUT = 10  # ثانية
+FETCH_CONNECT_TIMEOUT = 5  # ثانية
+FETCH_MAX_CONNECTIONS = 10  # الحد الأقصى لاتصالات التجمع
+FETCH_KEEPALIVE_CONNECTIONS = 5  # الاتصالات المحفوظة مفتوحة
+FETCH_CONCURRENCY = 4  # الحد الأقصى للطلبات المتزامنة
+FETCH_MAX_PAGES = 5  # أقصى عدد صفحات عند اللحاق بالمنشورات الفائتة
+CATCH_UP_MAX_AGE_MINUTES = 30  # أقصى عمر للمنشورات الفائتة التي تُرسل بعد توقف أو إعادة تشغيل
+# محرك تحليل HTML: "stream" (مستخرج مباشر) أو "strainer" أو "lxml" أو "html.parser"
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "stream")
+
+# إعدادات ذاكرة المنشورات المؤقتة
+POSTS_CACHE_TTL = 10  # ثانية - مدة صلاحية النتيجة
+POSTS_CACHE_STALE_TTL = 60  # ثانية - مدة إضافية تُعرض فيها النتيجة القديمة أثناء التحديث
+
+# حجم ذاكرة نتائج التصنيف (عدد المنشورات)
+CLASSIFY_CACHE_SIZE = 1024
+
+# إعدادات طابور الإرسال (حدود تليجرام: ~30 رسالة/ثانية عامة و1/ثانية لكل محادثة)
+SEND_GLOBAL_RATE = 25  # رسالة في الثانية
+SEND_PER_CHAT_RATE = 1  # رسالة في الثانية لكل محادثة
+SEND_WORKERS = 4
+SEND_MAX_RETRIES = 5
+SEND_BACKOFF_BASE = 2  # ثانية
+SEND_BACKOFF_MAX = 60  # ثانية
+DEAD_LETTER_FILE = "dead_letters.json"
+
+# الحد الأقصى لطول رسالة تليجرام (بوحدات UTF-16)
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# خادم المقاييس المحلي (صيغة Prometheus) - المنفذ 0 لتعطيله
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# نافذة قياس زمن وصول التنبيهات
+LATENCY_WINDOW_SIZE = 1000  # عدد العينات
+LATENCY_WINDOW_SECONDS = 24 * 60 * 60  # ثانية
+
+# وضع التحليل الاختياري: شجرة مراحل لكل دورة فحص ولكل معالج (الزمن الفعلي وزمن المعالج)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+PROFILE_SLOW_THRESHOLD = float(os.getenv("PROFILE_SLOW_THRESHOLD", "2"))  # ثانية - الأبطأ تُحفظ في ملف التتبع
+PROFILE_TRACE_FILE = "profile_traces.jsonl"
+PROFILE_TRACE_MAX_BYTES = 5 * 1024 * 1024  # حجم الملف قبل التدوير
+PROFILE_TRACE_BACKUPS = 3  # عدد الملفات القديمة المحفوظة
+PROFILE_CPROFILE_TOP = int(os.getenv("PROFILE_CPROFILE_TOP", "0"))  # حفظ cProfile لأبطأ N دورات فحص (0 = معطل)
+PROFILE_CPROFILE_DIR = "profiles"
+
+# محرك التخزين: "json" (ملفات JSON) أو "sqlite"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_DB_FILE = "bot_data.db"
+
+# مهلة حفظ الإعدادات المتراكمة على القرص
+SETTINGS_FLUSH_INTERVAL = 5  # ثانية
+
+# ذاكرة المنشورات المرسلة (منع التكرار)
+DEDUP_CAPACITY = 1000  # أقصى عدد معرفات محفوظة
+DEDUP_TTL_SECONDS = 24 * 60 * 60  # عمر المعرف قبل حذفه
+DEDUP_LOG_FILE = os.getenv("DEDUP_LOG_FILE")  # سجل اختياري على القرص (None = معطل)
+
 # إعداد التسجيل
 def setup_logging():
     logging.basicConfig(
@@ -0,0 +1,161 @@
+import os
+import time
+from collections import OrderedDict
+from config import logger, DEDUP_CAPACITY, DEDUP_TTL_SECONDS
+from post import post_number
+
+class DedupStore:
+    """مجموعة معرفات مرتبة بالإدراج مع حذف تلقائي بالعمر والحجم
+
+    الفحص والإضافة بزمن ثابت، والذاكرة محدودة بـ capacity مهما طال التشغيل.
+    يمكن ربطها بسجل على القرص (سطر لكل معرف) يُضغط عند تضاعف حجمه.
+    """
+
+    def __init__(self, capacity=DEDUP_CAPACITY, ttl=DEDUP_TTL_SECONDS, log_path=None):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.log_path = log_path
+        self._entries = OrderedDict()  # {post_id: added_at}
+        self._log_lines = 0
+        self._restored_max_id = None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "added": 0,
+            "restored": 0,
+            "evicted_ttl": 0,
+            "evicted_capacity": 0,
+            "suspected_resends": 0
+        }
+
+    def __contains__(self, post_id):
+        self._evict_expired(time.time())
+        if post_id in self._entries:
+            self.stats["hits"] += 1
+            return True
+        self.stats["misses"] += 1
+        return False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def add(self, post_id, added_at=None):
+        """إضافة معرف - تعيد True إذا كان جديداً"""
+        return bool(self.add_many([post_id], added_at))
+
+    def add_many(self, post_ids, added_at=None):
+        """إضافة عدة معرفات - تعيد قائمة المعرفات التي أضيفت فعلاً"""
+        now = time.time() if added_at is None else added_at
+        added = []
+        for post_id in post_ids:
+            if post_id in self._entries:
+                continue
+            self._track_resend(post_id)
+            self._entries[post_id] = now
+            added.append(post_id)
+
+        self.stats["added"] += len(added)
+        self._evict_expired(time.time())
+        self._evict_overflow()
+        if added and self.log_path:
+            self._append_log(added, now)
+        return added
+
+    def restore(self, items):
+        """استعادة معرفات محفوظة [(post_id, added_at أو None)] بعد إعادة التشغيل"""
+        now = time.time()
+        for post_id, added_at in items:
+            self._entries[post_id] = added_at if added_at is not None else now
+            self._entries.move_to_end(post_id)
+            number = post_number(post_id)
+            if number is not None and (self._restored_max_id is None or number > self._restored_max_id):
+                self._restored_max_id = number
+        self._evict_expired(now)
+        self._evict_overflow()
+        self.stats["restored"] = len(self._entries)
+
+    def load_log(self):
+        """استعادة المعرفات من سجل القرص - تعيد False إذا لم يوجد سجل"""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return False
+        items = []
+        try:
+            with open(self.log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    post_id, _, added_at = line.rstrip("\n").rpartition("\t")
+                    if post_id:
+                        items.append((post_id, float(added_at)))
+        except Exception as e:
+            logger.error(f"❌ خطأ في قراءة سجل المعرفات المرسلة: {e}")
+            return False
+        self.restore(items)
+        self._compact_log()
+        return True
+
+    def ids(self):
+        """المعرفات من الأقدم للأحدث"""
+        return list(self._entries)
+
+    def snapshot(self):
+        """أزواج (معرف، وقت الإضافة) من الأقدم للأحدث"""
+        return list(self._entries.items())
+
+    def clear(self):
+        """مسح كل المعرفات"""
+        self._entries.clear()
+        if self.log_path:
+            self._compact_log()
+
+    def _track_resend(self, post_id):
+        """عدّ المعرفات الأقدم من آخر معرف قبل إعادة التشغيل (غالباً إرسال مكرر بعد فقدها)"""
+        if self._restored_max_id is None:
+            return
+        number = post_number(post_id)
+        if number is not None and number <= self._restored_max_id:
+            self.stats["suspected_resends"] += 1
+
+    def _evict_expired(self, now):
+        """حذف المعرفات الأقدم من ttl (من بداية الترتيب)"""
+        if not self.ttl:
+            return
+        cutoff = now - self.ttl
+        entries = self._entries
+        while entries:
+            post_id, added_at = next(iter(entries.items()))
+            if added_at >= cutoff:
+                break
+            entries.popitem(last=False)
+            self.stats["evicted_ttl"] += 1
+
+    def _evict_overflow(self):
+        """حذف الأقدم عند تجاوز السعة"""
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.stats["evicted_capacity"] += 1
+
+    def _append_log(self, post_ids, added_at):
+        """إضافة أسطر للسجل وضغطه إذا تضاعف حجمه"""
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.writelines(f"{post_id}\t{added_at:.3f}\n" for post_id in post_ids)
+            self._log_lines += len(post_ids)
+            if self._log_lines > 2 * self.capacity:
+                self._compact_log()
+        except Exception as e:
+            logger.error(f"❌ خطأ في كتابة سجل المعرفات المرسلة: {e}")
+
+    def _compact_log(self):
+        """إعادة كتابة السجل بالمعرفات الحالية فقط (كتابة ذرية)"""
+        temp_path = f"{self.log_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.writelines(f"{post_id}\t{added_at:.3f}\n" for post_id, added_at in self._entries.items())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.log_path)
+            self._log_lines = len(self._entries)
+        except Exception as e:
+            logger.error(f"❌ خطأ في ضغط سجل المعرفات المرسلة: {e}")
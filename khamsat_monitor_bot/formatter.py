@@ -1,67 +1,169 @@
-from categories import CATEGORIES
-
-def format_post(post, index=None):
-    """تنسيق المنشور للعرض"""
-    categories = post['categories']
-    primary_category = categories[0] if categories else "أخرى"
-    primary_icon = CATEGORIES[primary_category]["icon"]
-    
-    # تنسيق التصنيفات
-    if len(categories) > 1:
-        categories_with_icons = []
-        for category in categories:
-            icon = CATEGORIES[category]["icon"]
-            categories_with_icons.append(f"{icon} {category}")
-        
-        categories_text = " | ".join(categories_with_icons)
-        prefix = f"*{categories_text} {index}*\n" if index else f"*{categories_text}:*\n"
-    else:
-        prefix = f"{primary_icon} *{primary_category} {index}*\n" if index else f"{primary_icon} *{primary_category}:*\n"
-    
-    return (
-        f"{prefix}"
-        f"*العنوان:* [{post['title']}]({post['link']})\n"
-        f"*الناشر:* {post['username']}\n"
-        f"*تاريخ النشر:* {post['time_text']}\n"
-        f"{'-'*40}"
-    )
+from datetime import datetime, timezone
+from categories import CATEGORIES, add_reload_listener
+from config import TELEGRAM_MESSAGE_LIMIT, CLASSIFY_CACHE_SIZE
+from lru import LRUCache, MISSING
 
-def format_posts_list(posts, show_index=True):
-    """تنسيق قائمة المنشورات"""
-    if not posts:
-        return "⚠️ لا توجد مواضيع متاحة"
-    
-    if show_index:
-        return "\n\n".join(format_post(p, i+1) for i, p in enumerate(posts))
-    else:
-        return "\n\n".join(format_post(p) for p in posts)
-
-def format_posts_list(posts, show_index=False):
-    """تنسيق قائمة من المنشورات للعرض"""
+SEPARATOR = "-" * 40
+
+# الرسائل بصيغة HTML: يكفي تهريب & < > (و " داخل الروابط) بجدول ثابت
+PARSE_MODE = "HTML"
+_HTML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+def escape_html(text):
+    """تهريب نص لإدراجه في رسالة HTML"""
+    return str(text).translate(_HTML_ESCAPES)
+
+# أنواع الرسائل
+LIST = "list"
+ALERT = "alert"
+
+_TITLES = {
+    LIST: "📋 <b>المواضيع المتاحة:</b>",
+    ALERT: "🔔 <b>مواضيع جديدة:</b>"
+}
+
+# بداية رأس كل مجموعة فئات ونصها: (افتتاح، نص) - تُحسب مرة لكل مجموعة
+_headers = {}
+add_reload_listener(_headers.clear)
+
+# أجزاء المنشورات المنسقة بمفتاح (معرف، عنوان، وقت، فئات)
+_fragments = LRUCache(CLASSIFY_CACHE_SIZE)
+
+def _category_header(categories):
+    """رأس المنشور حسب فئاته: "📁 <b>الفئة" لفئة واحدة أو "<b>📁 أ | 🎨 ب" لعدة فئات"""
+    header = _headers.get(categories)
+    if header is None:
+        if len(categories) > 1:
+            text = " | ".join(f"{CATEGORIES[category]['icon']} {escape_html(category)}" for category in categories)
+            header = ("<b>", text)
+        else:
+            category = categories[0] if categories else "أخرى"
+            header = (f"{CATEGORIES[category]['icon']} <b>", escape_html(category))
+        _headers[categories] = header
+    return header
+
+def _count(number, one, two, few):
+    """العدد مع التمييز العربي: دقيقة، دقيقتين، 3 دقائق، 11 دقيقة"""
+    if number == 1:
+        return one
+    if number == 2:
+        return two
+    return f"{number} {few if number <= 10 else one}"
+
+def relative_time(posted_at, now=None):
+    """وقت النشر النسبي ("منذ 5 دقائق") محسوباً لحظة العرض - None إذا كان وقت النشر مجهولاً"""
+    if posted_at is None:
+        return None
+    now = now or datetime.now(timezone.utc)
+    minutes = max(0, int((now - posted_at).total_seconds() // 60))
+    if minutes < 1:
+        return "منذ أقل من دقيقة"
+    if minutes < 60:
+        return f"منذ {_count(minutes, 'دقيقة', 'دقيقتين', 'دقائق')}"
+    hours = minutes // 60
+    if hours < 24:
+        return f"منذ {_count(hours, 'ساعة', 'ساعتين', 'ساعات')}"
+    return f"منذ {_count(hours // 24, 'يوم', 'يومين', 'أيام')}"
+
+def _post_body(post, title=None, now=None):
+    """جسم المنشور (بدون الرأس) من الذاكرة أو بتنسيقه وتهريبه مرة واحدة
+
+    الوقت النسبي يُحسب من posted_at عند كل عرض (نص الصفحة يتجمد في النتائج المحفوظة)،
+    ولا يُستخدم نص الصفحة إلا إذا تعذر تحليل وقت النشر.
+    """
+    title = post.title if title is None else title
+    time_text = relative_time(post.posted_at, now) or post.time_text
+    key = (post.id, title, time_text, post.categories)
+    body = _fragments.get(key)
+    if body is MISSING:
+        body = (
+            f"<b>العنوان:</b> <a href=\"{escape_html(post.link)}\">{escape_html(title)}</a>\n"
+            f"<b>الناشر:</b> {escape_html(post.username)}\n"
+            f"<b>تاريخ النشر:</b> {escape_html(time_text)}\n"
+            f"{SEPARATOR}"
+        )
+        _fragments.put(key, body)
+    return body
+
+def format_post(post, index=None, title=None, now=None):
+    """تنسيق المنشور للعرض (now: لحظة العرض المشتركة لحساب الوقت النسبي)"""
+    opening, text = _category_header(post.categories)
+    suffix = f" {index}</b>\n" if index else ":</b>\n"
+    return f"{opening}{text}{suffix}{_post_body(post, title, now)}"
+
+def utf16_length(text):
+    """طول النص بوحدات UTF-16 كما يحسبه تليجرام (الوسوم تُحذف عند الإرسال فهذا حد أعلى)"""
+    return len(text.encode("utf-16-le")) // 2
+
+def _fit_post(post, index, budget, now=None):
+    """تنسيق منشور واحد أطول من الرسالة بتقصير عنوانه قبل التهريب (دون كسر رابط أو وسم)"""
+    fragment = format_post(post, index, now=now)
+    title = post.title
+    while title and utf16_length(fragment) > budget:
+        overflow = utf16_length(fragment) - budget
+        title = title[:max(0, len(title) - overflow - 1)]
+        fragment = format_post(post, index, f"{title}…", now)
+    return fragment
+
+def chunk_posts(posts, kind=LIST, show_index=True, limit=TELEGRAM_MESSAGE_LIMIT):
+    """نقطة الدخول الوحيدة لتنسيق الرسائل مقسمة على حد طول تليجرام
+
+    LIST: قائمة (مرقمة افتراضياً) للعرض عند الطلب.
+    ALERT: تنبيه بالمنشورات الجديدة من الأقدم للأحدث بدون ترقيم.
+    تعيد قائمة (نص الرسالة، [منشوراتها]) بأقل عدد رسائل ممكن مع الحفاظ
+    على الترتيب، دون تقسيم منشور أو عنصر تنسيق بين رسالتين (limit=None: رسالة واحدة).
+    """
+    posts = list(posts)
     if not posts:
-        return "⚠️ لا توجد مواضيع متاحة"
-    
-    formatted_message = "📋 *المواضيع المتاحة:*\n\n"
-    
-    for i, post in enumerate(posts, 1):
-        # إضافة رقم تسلسلي إذا كان مطلوباً
-        if show_index:
-            formatted_message += f"*{i}.* "
-        
-        # تنسيق المنشور الواحد
-        single_post = format_single_post(post)
-        formatted_message += single_post + "\n\n"
-    
-    # إزالة الأسطر الإضافية في النهاية
-    formatted_message = formatted_message.strip()
-    
-    return formatted_message
+        return []
+
+    if kind == ALERT:
+        posts.reverse()
+        show_index = False
+
+    header = f"{_TITLES[kind]}\n\n"
+    now = datetime.now(timezone.utc)
+    budget = limit - utf16_length(header) if limit else float("inf")
+    gap = utf16_length("\n\n")
+    chunks = []
+    fragments, current_posts, size = [], [], 0
+
+    for index, post in enumerate(posts, 1):
+        index = index if show_index else None
+        fragment = format_post(post, index, now=now)
+        length = utf16_length(fragment)
+        if length > budget:
+            fragment = _fit_post(post, index, budget, now)
+            length = utf16_length(fragment)
+
+        if fragments and size + gap + length > budget:
+            chunks.append((header + "\n\n".join(fragments), current_posts))
+            fragments, current_posts, size = [], [], 0
+
+        size += (gap if fragments else 0) + length
+        fragments.append(fragment)
+        current_posts.append(post)
 
+    chunks.append((header + "\n\n".join(fragments), current_posts))
+    return chunks
+
+def render_messages(posts, kind=LIST, show_index=True, limit=TELEGRAM_MESSAGE_LIMIT):
+    """نصوص الرسائل فقط (قائمة فارغة إذا لم توجد منشورات)"""
+    return [text for text, _ in chunk_posts(posts, kind, show_index, limit)]
+
+def render_posts(posts, kind=LIST, show_index=True):
+    """رسالة واحدة بدون حد للطول - None إذا لم توجد منشورات"""
+    chunks = chunk_posts(posts, kind, show_index, limit=None)
+    return chunks[0][0] if chunks else None
+
+def format_posts_list(posts, show_index=True):
+    """تنسيق قائمة المنشورات (رسالة أو أكثر حسب الطول)"""
+    return render_messages(posts, LIST, show_index) or ["⚠️ لا توجد مواضيع متاحة"]
 
 def format_new_posts_alert(posts):
-    """تنسيق تنبيه المنشورات الجديدة"""
-    if not posts:
-        return None
-    
-    message = format_posts_list(reversed(posts), show_index=False)
-    return f"🔔 *مواضيع جديدة:*\n\n{message}"
+    """تنسيق تنبيه المنشورات الجديدة: [(نص الرسالة، [منشوراتها])]"""
+    return chunk_posts(posts, ALERT)
+
+def get_render_stats():
+    """إحصائيات ذاكرة أجزاء المنشورات"""
+    return _fragments.stats()
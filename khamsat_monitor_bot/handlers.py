@@ -1,7 +1,7 @@
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
-from config import ALLOWED_USER_ID, logger
-from scraper import fetch_posts
+from config import ALLOWED_USER_ID, logger, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL
+from post_cache import post_cache
 from formatter import format_posts_list
 # استيراد مدير الإعدادات
 from settings_manager import settings_manager
@@ -11,6 +11,7 @@ from post_filter import filter_posts_by_category
 from access_control import access_control
 from user_manager import user_manager
 from admin_handlers import admin_handlers
+from profiler import profiled, profiler
 
 def get_keyboard(is_admin=False):
     """إنشاء لوحة المفاتيح"""
@@ -23,6 +24,7 @@ def get_keyboard(is_admin=False):
     if is_admin:
         # إضافة أزرار خاصة بالأدمن
         basic_keyboard.append(["👥 طلبات الانتظار", "📊 إحصائيات المستخدمين"])
+        basic_keyboard.append(["⏱️ زمن وصول التنبيهات"])
     
     return ReplyKeyboardMarkup(basic_keyboard, resize_keyboard=True)
 
@@ -31,6 +33,7 @@ def check_permission(update: Update):
     user_id = update.effective_user.id
     return user_manager.is_admin(user_id) or user_manager.is_approved(user_id)
 
+@profiled
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """بدء البوت"""
     # فحص صلاحية الوصول أولاً
@@ -42,12 +45,14 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     logger.info(f"🚀 تم بدء البوت - المستخدم: {update.effective_user.first_name}")
     
-    # عرض حالة المراقبة الحالية
+    # عرض حالة المراقبة العامة وحالة تنبيهات المستخدم
     monitoring_status = "🟢 مفعل" if settings_manager.is_monitoring_active() else "🔴 معطل"
+    alerts_status = "🟢 مفعلة" if settings_manager.is_user_alerts_enabled(user_id) else "🔴 متوقفة"
     
     welcome_message = f"🔥 بوت مراقبة خمسات\n"
-    welcome_message += f"📈 يعرض المواضيع الحديثة فقط (أقل من 3 دقائق)\n"
+    welcome_message += f"📈 تنبيه فوري بكل طلب جديد منذ آخر فحص\n"
     welcome_message += f"📊 حالة الرصد التلقائي: {monitoring_status}\n"
+    welcome_message += f"🔔 تنبيهاتك: {alerts_status}\n"
     
     if is_admin:
         welcome_message += f"\n👑 مرحباً بك أيها الأدمن!"
@@ -66,36 +71,51 @@ async def show_posts(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = update.effective_user.id
     logger.info(f"📋 طلب عرض المنشورات من المستخدم {user_id}")
-    recent_posts, all_posts = fetch_posts()
+    result = await post_cache.get()
     
     # تطبيق تصفية الفئات الشخصية
-    filtered_posts = filter_posts_by_category(all_posts[:10], user_id)
+    filtered_posts = filter_posts_by_category(result.all_posts[:10], user_id)
     
     if not filtered_posts:
         await update.message.reply_text("⚠️ لا توجد مواضيع متاحة للفئات المختارة")
         return
     
-    message = format_posts_list(filtered_posts, show_index=True)
-    await update.message.reply_markdown(message, disable_web_page_preview=True)
+    for message in format_posts_list(filtered_posts, show_index=True):
+        await update.message.reply_html(message, disable_web_page_preview=True)
     logger.info(f"✅ تم عرض {len(filtered_posts)} موضوع للمستخدم {user_id}")
 
 async def start_monitoring(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """تفعيل المراقبة"""
+    """تفعيل التنبيهات للمستخدم - والرصد العام إذا كان الأدمن"""
     if not check_permission(update):
         return
     
-    settings_manager.set_monitoring_active(True)
-    logger.info("🚨 تم تفعيل الرصد التلقائي")
-    await update.message.reply_text("✅ تم تفعيل الرصد التلقائي")
+    user_id = update.effective_user.id
+    settings_manager.set_user_alerts(user_id, True)
+    
+    if user_manager.is_admin(user_id):
+        settings_manager.set_monitoring_active(True)
+        logger.info("🚨 تم تفعيل الرصد التلقائي")
+        await update.message.reply_text("✅ تم تفعيل الرصد التلقائي")
+    elif settings_manager.is_monitoring_active():
+        await update.message.reply_text("✅ تم تفعيل تنبيهاتك")
+    else:
+        await update.message.reply_text("✅ تم تفعيل تنبيهاتك\n⚠️ الرصد التلقائي متوقف حالياً من الإدارة")
 
 async def stop_monitoring(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """إيقاف المراقبة"""
+    """إيقاف التنبيهات للمستخدم - أو الرصد العام إذا كان الأدمن"""
     if not check_permission(update):
         return
     
-    settings_manager.set_monitoring_active(False)
-    logger.info("⛔️ تم إيقاف الرصد التلقائي")
-    await update.message.reply_text("⛔️ تم إيقاف الرصد")
+    user_id = update.effective_user.id
+    if user_manager.is_admin(user_id):
+        # الأدمن يوقف الرصد للجميع (لا جلب ولا تنبيهات)
+        settings_manager.set_monitoring_active(False)
+        logger.info("⛔️ تم إيقاف الرصد التلقائي")
+        await update.message.reply_text("⛔️ تم إيقاف الرصد للجميع")
+        return
+    
+    settings_manager.set_user_alerts(user_id, False)
+    await update.message.reply_text("⛔️ تم إيقاف تنبيهاتك - يمكنك تفعيلها في أي وقت")
 
 async def select_categories(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """عرض قائمة اختيار الفئات"""
@@ -114,6 +134,7 @@ async def select_categories(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=category_filter.create_category_keyboard()
     )
 
+@profiled
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """عرض المساعدة"""
     if not check_permission(update):
@@ -133,15 +154,16 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(
         "🧭 *الأوامر المتاحة:*\n\n"
         "📋 *عرض الطلبات الجديدة* - أول 10 مواضيع\n"
-        "🚨 *تفعيل الرصد التلقائي* - مراقبة كل 30 ثانية\n"
-        "⛔️ *إيقاف الرصد* - إيقاف المراقبة\n"
+        f"🚨 *تفعيل الرصد التلقائي* - فحص كل {POLL_MIN_INTERVAL}-{POLL_MAX_INTERVAL} ثانية حسب نشاط الموقع\n"
+        "⛔️ *إيقاف الرصد* - إيقاف تنبيهاتك الشخصية\n"
         "🏷️ *اختيار الفئات* - تخصيص فئاتك الشخصية\n"
         "🧭 *عرض الأوامر* - هذه الرسالة\n\n"
         f"📊 *فئاتك الحالية:* {categories_status}\n"
-        "⚡️ يتم إرسال المواضيع الحديثة فقط (أقل من 3 دقائق)",
+        "⚡️ يتم إرسال الطلبات الجديدة منذ آخر فحص فقط",
         parse_mode="Markdown"
     )
 
+@profiled
 async def handle_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """معالج الأزرار"""
     if not check_permission(update):
@@ -163,7 +185,8 @@ async def handle_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # معالجات خاصة بالأدمن
     admin_handlers_dict = {
         "👥 طلبات الانتظار": admin_handlers.show_pending_users,
-        "📊 إحصائيات المستخدمين": admin_handlers.show_stats
+        "📊 إحصائيات المستخدمين": admin_handlers.show_stats,
+        "⏱️ زمن وصول التنبيهات": admin_handlers.show_latency
     }
     
     # دمج المعالجات حسب صلاحية المستخدم
@@ -173,7 +196,8 @@ async def handle_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     handler = handlers.get(text)
     if handler:
-        await handler(update, context)
+        with profiler.span(handler.__name__):
+            await handler(update, context)
     else:
         await update.message.reply_text("⚠️ أمر غير معروف. استخدم الأزرار.")
 
@@ -0,0 +1,159 @@
+from html.parser import HTMLParser
+
+# عناصر لا تُغلق في HTML ولا تدخل في مكدس العناصر المفتوحة
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr"
+}
+
+class _LimitReached(Exception):
+    """إيقاف التحليل مبكراً بعد الوصول للعدد المطلوب من الصفوف"""
+
+class _Capture:
+    """التقاط نص عنصر مستهدف حتى إغلاقه"""
+
+    def __init__(self, field, depth):
+        self.field = field
+        self.depth = depth
+        self.parts = []
+
+class PostRowExtractor(HTMLParser):
+    """مستخرج مباشر لصفوف tr.forum_post دون بناء شجرة كاملة
+
+    يطابق نتائج محددات extract_post_data:
+    - h3.details-head a  (العنوان والرابط)
+    - a.user              (الناشر)
+    - li.d-lg-inline-block span[dir='ltr']  (الوقت)
+    """
+
+    def __init__(self, limit=None):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.rows = []
+        self._row = None
+        self._stack = []
+        self._captures = []
+        self._head_depth = None
+        self._li_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._row is None:
+            if tag == "tr" and not self._done():
+                attrs = dict(attrs)
+                if "forum_post" in (attrs.get("class") or "").split():
+                    self._start_row(attrs)
+            return
+
+        if tag in VOID_ELEMENTS:
+            return
+
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "tr" and "forum_post" in classes:
+            # </tr> اختياري في HTML: بداية صف منشور جديد تنهي الصف المفتوح
+            self._finish_row()
+            self._start_row(attrs)
+            return
+
+        self._stack.append(tag)
+        depth = len(self._stack)
+        row = self._row
+
+        if tag == "h3" and self._head_depth is None and "details-head" in classes:
+            self._head_depth = depth
+        elif tag == "li" and self._li_depth is None and "d-lg-inline-block" in classes:
+            self._li_depth = depth
+
+        if tag == "a":
+            if self._head_depth is not None and "title" not in row:
+                row["title"] = ""
+                row["href"] = attrs.get("href")
+                self._captures.append(_Capture("title", depth))
+            if "user" in classes and "username" not in row:
+                row["username"] = ""
+                self._captures.append(_Capture("username", depth))
+        elif tag == "span" and self._li_depth is not None and "time_text" not in row:
+            if attrs.get("dir") == "ltr":
+                row["time_text"] = ""
+                row["timestamp"] = attrs.get("title") or ""
+                self._captures.append(_Capture("time_text", depth))
+
+    def handle_endtag(self, tag):
+        if self._row is None:
+            return
+
+        if tag not in self._stack:
+            # إغلاق الصف نفسه أو وسم بلا مقابل
+            if tag == "tr":
+                self._finish_row()
+            return
+
+        # إغلاق كل العناصر المفتوحة حتى العنصر المطابق
+        while self._stack:
+            depth = len(self._stack)
+            closed = self._stack.pop()
+            self._close_depth(depth)
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        if not self._captures:
+            return
+        text = data.strip()
+        if text:
+            for capture in self._captures:
+                capture.parts.append(text)
+
+    def close(self):
+        super().close()
+        if self._row is not None:
+            self._finish_row()
+        return self.rows
+
+    def _done(self):
+        return self.limit is not None and len(self.rows) >= self.limit
+
+    def _start_row(self, attrs):
+        self._row = {"id": attrs.get("id") or ""}
+        self._stack = []
+        self._captures = []
+        self._head_depth = None
+        self._li_depth = None
+
+    def _close_depth(self, depth):
+        """إنهاء أي التقاط أو سياق بدأ عند هذا العمق"""
+        remaining = []
+        for capture in self._captures:
+            if capture.depth == depth:
+                self._row[capture.field] = "".join(capture.parts)
+            else:
+                remaining.append(capture)
+        self._captures = remaining
+        if self._head_depth == depth:
+            self._head_depth = None
+        if self._li_depth == depth:
+            self._li_depth = None
+
+    def _finish_row(self):
+        while self._stack:
+            depth = len(self._stack)
+            self._stack.pop()
+            self._close_depth(depth)
+        self.rows.append(self._row)
+        self._row = None
+        if self._done():
+            raise _LimitReached()
+
+def extract_post_rows(html, limit=None):
+    """استخراج الحقول الخام لصفوف المنشورات من نص HTML
+
+    كل صف قاموس يحوي id دائماً، و title/href/username/time_text/timestamp
+    فقط إذا وُجدت عناصرها في الصف.
+    """
+    extractor = PostRowExtractor(limit)
+    try:
+        extractor.feed(html)
+        extractor.close()
+    except _LimitReached:
+        pass
+    return extractor.rows
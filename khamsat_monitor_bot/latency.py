@@ -0,0 +1,98 @@
+import time
+from collections import deque, OrderedDict
+from config import logger, LATENCY_WINDOW_SIZE, LATENCY_WINDOW_SECONDS
+from metrics import registry
+
+# مراحل رحلة المنشور بالترتيب
+POSTED = "posted"
+SEEN = "seen"
+RENDERED = "rendered"
+ENQUEUED = "enqueued"
+DELIVERED = "delivered"
+STAGES = (POSTED, SEEN, RENDERED, ENQUEUED, DELIVERED)
+
+# الفترات المقاسة: (الاسم، من مرحلة، إلى مرحلة)
+SPANS = (
+    ("posted_to_seen", POSTED, SEEN),
+    ("seen_to_rendered", SEEN, RENDERED),
+    ("rendered_to_enqueued", RENDERED, ENQUEUED),
+    ("enqueued_to_delivered", ENQUEUED, DELIVERED),
+    ("total", POSTED, DELIVERED),
+)
+
+ALERT_LATENCY = registry.histogram(
+    "khamsat_alert_latency_seconds", "Alert latency per stage, from post time to first delivery",
+    ("span",), buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+
+def percentile(sorted_values, fraction):
+    """نسبة مئوية بالاستيفاء الخطي من قائمة مرتبة"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+class LatencyTracker:
+    """تتبع زمن كل منشور عبر المراحل من النشر حتى أول تسليم
+
+    المنشورات الجارية محدودة العدد، والعينات المكتملة في نافذة متحركة
+    (آخر LATENCY_WINDOW_SIZE عينة خلال LATENCY_WINDOW_SECONDS).
+    """
+
+    def __init__(self, window_size=LATENCY_WINDOW_SIZE, window_seconds=LATENCY_WINDOW_SECONDS,
+                 max_pending=1000):
+        self.window_seconds = window_seconds
+        self.max_pending = max_pending
+        self._pending = OrderedDict()  # {post_id: {stage: unix time}}
+        self._samples = {name: deque(maxlen=window_size) for name, _, _ in SPANS}  # [(وقت العينة، المدة)]
+
+    def mark(self, post_id, stage, at=None):
+        """تسجيل وقت وصول منشور لمرحلة (أول مرة فقط)"""
+        stages = self._pending.get(post_id)
+        if stages is None:
+            stages = self._pending[post_id] = {}
+            if len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+        stages.setdefault(stage, time.time() if at is None else at)
+
+    def seen(self, post, seen_at=None):
+        """أول ظهور للمنشور كجديد (مع وقت نشره على خمسات)"""
+        if post.posted_at is not None:
+            self.mark(post.id, POSTED, post.posted_at.timestamp())
+        self.mark(post.id, SEEN, seen_at)
+
+    def delivered(self, post_id, at=None):
+        """أول تسليم ناجح: حساب المدد وإنهاء تتبع المنشور"""
+        stages = self._pending.pop(post_id, None)
+        if stages is None:
+            return
+        stages.setdefault(DELIVERED, time.time() if at is None else at)
+        now = time.time()
+        for name, start, end in SPANS:
+            if start in stages and end in stages:
+                duration = max(0.0, stages[end] - stages[start])
+                self._samples[name].append((now, duration))
+                ALERT_LATENCY.observe(duration, span=name)
+        if POSTED in stages:
+            logger.debug(f"⏱️ المنشور {post_id} وصل بعد {stages[DELIVERED] - stages[POSTED]:.1f} ثانية من نشره")
+
+    def discard(self, post_id):
+        """إيقاف تتبع منشور لم يُسلَّم لأي مستخدم"""
+        self._pending.pop(post_id, None)
+
+    def percentiles(self, fractions=(0.5, 0.95, 0.99)):
+        """{الفترة: {"count": n, 0.5: ..., 0.95: ..., 0.99: ...}} داخل النافذة الزمنية"""
+        cutoff = time.time() - self.window_seconds
+        report = {}
+        for name, samples in self._samples.items():
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            values = sorted(duration for _, duration in samples)
+            report[name] = {"count": len(values)}
+            report[name].update({fraction: percentile(values, fraction) for fraction in fractions})
+        return report
+
+# إنشاء مثيل مشترك
+latency_tracker = LatencyTracker()
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+
+# علامة الإخفاق: تميز "غير موجود" عن القيم المخزنة مثل None
+MISSING = object()
+
+class LRUCache:
+    """ذاكرة LRU محدودة الحجم مع إحصائيات الإصابات والإخفاقات
+
+    get تعيد MISSING عند الإخفاق، لذا يمكن تخزين أي قيمة بما فيها None.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """إرجاع القيمة المخزنة أو MISSING"""
+        value = self._entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """تخزين قيمة مع حذف الأقدم عند امتلاء الذاكرة"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """مسح الذاكرة"""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """إحصائيات الذاكرة"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -7,6 +7,10 @@ from config import BOT_TOKEN, logger
 from handlers import start, help_command, handle_buttons
 from monitor import PostMonitor
 from settings_manager import settings_manager
+from scraper import close_http_client
+from send_queue import send_queue
+from metrics import start_metrics_server
+from profiler import profiler
 
 async def error_handler(update, context):
     """معالج الأخطاء العام"""
@@ -33,9 +37,14 @@ async def main():
     # إضافة معالج الأخطاء
     app.add_error_handler(error_handler)
     
-    # إنشاء نظام المراقبة
+    # تشغيل طابور الإرسال ثم نظام المراقبة
+    send_queue.start(app.bot)
     monitor = PostMonitor()
     asyncio.create_task(monitor.monitor_loop(app))
+    asyncio.create_task(settings_manager.flush_loop())
+    metrics_server = await start_metrics_server()
+    if profiler.enabled:
+        logger.info(f"🔬 وضع التحليل مفعّل - الدورات الأبطأ من {profiler.slow_threshold} ثانية تُحفظ في {profiler.trace_file}")
     
     # عرض حالة المراقبة عند بدء التشغيل
     if settings_manager.is_monitoring_active():
@@ -44,7 +53,15 @@ async def main():
         logger.info("🔴 البوت يعمل بوضع يدوي - استخدم /start لتفعيل المراقبة")
     
     logger.info("✅ البوت جاهز!")
-    await app.run_polling()
+    try:
+        await app.run_polling()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await monitor.stop()
+        await send_queue.stop()
+        await close_http_client()
+        settings_manager.flush()
 
 if __name__ == "__main__":
     nest_asyncio.apply()
@@ -0,0 +1,233 @@
+import asyncio
+import bisect
+import time
+from contextlib import contextmanager
+from config import logger, METRICS_HOST, METRICS_PORT
+
+# حدود الهيستوجرام الافتراضية (بالثواني)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _label_key(labelnames, labels):
+    """قيم التسميات بترتيب ثابت"""
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, key, extra=None):
+    """{name="value",...} أو نص فارغ إذا لم توجد تسميات"""
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    """عداد تراكمي"""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def total(self):
+        return sum(self._values.values())
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+class Gauge:
+    """قيمة لحظية - تُضبط يدوياً أو تُقرأ من دالة عند العرض"""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), callback=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values = {}
+
+    def set(self, value, **labels):
+        self._values[_label_key(self.labelnames, labels)] = value
+
+    def value(self, **labels):
+        if self.callback is not None:
+            return self.callback()
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        if self.callback is not None:
+            yield f"{self.name} {self.callback()}"
+            return
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+class Histogram:
+    """توزيع قيم (أزمنة غالباً) على حدود ثابتة مع المجموع والعدد"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # {key: [counts per bucket..., sum, count]}
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """قياس زمن كتلة كود"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self):
+        return sum(series[-1] for series in self._series.values())
+
+    def mean(self):
+        """متوسط كل القيم (لكل التسميات)"""
+        count = self.count()
+        return sum(series[-2] for series in self._series.values()) / count if count else 0.0
+
+    def samples(self):
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', str(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}"
+
+class Registry:
+    """مجموعة المقاييس المسجلة"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            return self._metrics[metric.name]
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), callback=None):
+        return self.register(Gauge(name, help_text, labelnames, callback))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """كل المقاييس بصيغة Prometheus النصية"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                lines.extend(metric.samples())
+            except Exception as e:
+                logger.error(f"❌ خطأ في قراءة المقياس {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# الجلب والتحليل
+FETCH_SECONDS = registry.histogram("khamsat_fetch_seconds", "Time to fetch one listing page", ("page",))
+FETCH_RESPONSES = registry.counter("khamsat_fetch_responses_total", "Listing page responses by status code", ("code",))
+FETCH_ERRORS = registry.counter("khamsat_fetch_errors_total", "Listing fetches that raised an exception")
+FETCH_RESULTS = registry.counter("khamsat_fetch_results_total", "First page fetch outcomes", ("status",))
+PARSE_SECONDS = registry.histogram("khamsat_parse_seconds", "Time to extract posts from one page", ("backend",))
+POSTS_EXTRACTED = registry.counter("khamsat_posts_extracted_total", "Posts extracted from listing pages")
+POST_EXTRACT_FAILURES = registry.counter("khamsat_post_extract_failures_total", "Rows that could not be turned into posts")
+TIMESTAMP_FAILURES = registry.counter("khamsat_timestamp_parse_failures_total", "Post timestamps that could not be parsed")
+CLASSIFY_SECONDS = registry.histogram(
+    "khamsat_classify_seconds", "Time to classify one uncached title",
+    buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01)
+)
+CLASSIFY_LOOKUPS = registry.counter("khamsat_classify_lookups_total", "Classification lookups", ("cache",))
+
+# دورة الفحص
+CHECK_SECONDS = registry.histogram("khamsat_check_seconds", "Duration of one monitor check cycle")
+CHECKS = registry.counter("khamsat_checks_total", "Monitor check cycles by outcome", ("result",))
+NEW_POSTS = registry.counter("khamsat_new_posts_total", "New posts found by the monitor")
+UNDELIVERED_POSTS = registry.counter(
+    "khamsat_undelivered_posts_total", "New posts whose alerts all ended in the dead-letter file"
+)
+
+# الإرسال
+SEND_SECONDS = registry.histogram("khamsat_send_seconds", "Telegram sendMessage call duration")
+SEND_RESULTS = registry.counter("khamsat_send_results_total", "Telegram send attempts by outcome", ("result",))
+
+def metrics_summary():
+    """ملخص مختصر للمقاييس الأساسية (لعرضه في إحصائيات الأدمن)"""
+    return {
+        "fetches": FETCH_SECONDS.count(),
+        "fetch_avg_ms": FETCH_SECONDS.mean() * 1000,
+        "fetch_errors": FETCH_RESULTS.value(status="error"),
+        "parse_avg_ms": PARSE_SECONDS.mean() * 1000,
+        "checks": CHECK_SECONDS.count(),
+        "check_avg_ms": CHECK_SECONDS.mean() * 1000,
+        "new_posts": NEW_POSTS.total(),
+        "sent": SEND_RESULTS.value(result="sent"),
+        "send_failures": SEND_RESULTS.total() - SEND_RESULTS.value(result="sent"),
+        "send_avg_ms": SEND_SECONDS.mean() * 1000
+    }
+
+async def _handle_request(reader, writer):
+    """خدمة طلب HTTP واحد: GET /metrics فقط"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # تجاهل باقي الرؤوس
+        while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", registry.render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body, content_type = "404 Not Found", b"not found\n", "text/plain"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"خطأ في طلب المقاييس: {e}")
+    finally:
+        writer.close()
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """تشغيل خادم المقاييس المحلي - None إذا كان معطلاً (المنفذ 0) أو تعذر تشغيله"""
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(_handle_request, host, port)
+    except OSError as e:
+        logger.error(f"❌ تعذر تشغيل خادم المقاييس على {host}:{port}: {e}")
+        return None
+    logger.info(f"📈 المقاييس متاحة على http://{host}:{port}/metrics")
+    return server
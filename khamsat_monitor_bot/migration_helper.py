@@ -1,6 +1,8 @@
+import argparse
 import json
 import os
-from config import ALLOWED_USER_ID, logger
+import sys
+from config import ALLOWED_USER_ID, SQLITE_DB_FILE, STORAGE_BACKEND, logger
 
 def migrate_old_settings():
     """ترحيل الإعدادات من النظام القديم إلى الجديد"""
@@ -45,6 +47,59 @@ def migrate_old_settings():
     except Exception as e:
         logger.error(f"❌ خطأ في ترحيل الإعدادات: {e}")
 
+def migrate_json_to_sqlite(store=None, settings_file="bot_settings.json", users_file="bot_users.json"):
+    """استيراد ملفات JSON الحالية إلى قاعدة SQLite (مرة واحدة فقط)"""
+    from storage import SQLiteStore
+    
+    store = store or SQLiteStore(SQLITE_DB_FILE)
+    if not store.is_empty():
+        logger.info("ℹ️ قاعدة البيانات تحتوي على بيانات بالفعل - تم تخطي الاستيراد")
+        return
+    
+    # تحويل الإعدادات القديمة أولاً إن وجدت
+    migrate_old_settings()
+    
+    documents = {}
+    for key, path in (("settings", settings_file), ("users", users_file)):
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    documents[key] = json.load(f)
+            except Exception as e:
+                logger.error(f"❌ خطأ في قراءة {path}: {e}")
+                return
+    
+    if not documents:
+        logger.info("📁 لا توجد ملفات JSON للاستيراد")
+        return
+    
+    try:
+        store.import_documents(documents.get("settings"), documents.get("users"))
+        users = documents.get("users", {})
+        logger.info(
+            f"✅ تم استيراد البيانات إلى SQLite: "
+            f"{len(users.get('approved_users', []))} معتمد، "
+            f"{len(users.get('pending_users', {}))} في الانتظار، "
+            f"{len(users.get('rejected_users', []))} مرفوض"
+        )
+    except Exception as e:
+        logger.error(f"❌ خطأ في الاستيراد إلى SQLite: {e}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ترحيل إعدادات البوت")
+    parser.add_argument("--sqlite", action="store_true",
+                        help=f"الاستيراد إلى {SQLITE_DB_FILE} حتى لو لم يكن STORAGE_BACKEND=sqlite")
+    args = parser.parse_args(argv)
+
+    migrate_old_settings()
+    if STORAGE_BACKEND != "sqlite" and not args.sqlite:
+        # لا داعي لإنشاء قاعدة بيانات لا يقرؤها البوت
+        logger.info(f"ℹ️ التخزين الحالي {STORAGE_BACKEND} - لم يتم إنشاء {SQLITE_DB_FILE} "
+                    f"(استخدم STORAGE_BACKEND=sqlite أو --sqlite للاستيراد إلى SQLite)")
+        return 0
+    migrate_json_to_sqlite()
+    return 0
+
 if __name__ == "__main__":
     # تشغيل الترحيل مباشرة
-    migrate_old_settings()
+    sys.exit(main())
@@ -1,61 +1,192 @@
 import asyncio
-from telegram.error import NetworkError, TelegramError
-from config import ALLOWED_USER_ID, MONITORING_INTERVAL, logger
-from scraper import fetch_posts
-from formatter import format_new_posts_alert
+from functools import partial
+from config import ALLOWED_USER_ID, logger
+from post_cache import post_cache
+from scraper import fetch_posts_since
+from post import post_number
+from formatter import format_new_posts_alert, PARSE_MODE
 from handlers import is_monitoring_active
 from settings_manager import settings_manager
+from user_manager import user_manager
+from subscription_index import subscription_index
+from send_queue import send_queue
+from scheduler import poll_scheduler
+from metrics import CHECK_SECONDS, CHECKS, NEW_POSTS, UNDELIVERED_POSTS
+from latency import latency_tracker, RENDERED, ENQUEUED
+from profiler import profiler
+
+def _record_delivery(post_ids, future):
+    """تسجيل أول تسليم ناجح لمنشورات رسالة (لقياس زمن الوصول)"""
+    if not future.cancelled() and future.exception() is None and future.result():
+        for post_id in post_ids:
+            latency_tracker.delivered(post_id)
 
 class PostMonitor:
     def __init__(self):
-        # تحميل المعرفات المحفوظة من الإعدادات
-        self.last_sent_ids = settings_manager.get_sent_ids()
+        # ذاكرة المعرفات المرسلة المشتركة مع الإعدادات (محدودة بالحجم والعمر)
+        self.sent_ids = settings_manager.get_sent_ids()
+        # بصمة آخر صفحة تمت معالجتها لتخطي الدورات بدون تغيير
+        self.last_digest = None
+        # منشورات في طابور الإرسال بانتظار تأكيد التسليم
+        self.in_flight_ids = set()
+        # مهام تأكيد التسليم الجارية (مرجع قوي حتى لا تُجمع قبل انتهائها)
+        self._delivery_tasks = set()
     
     async def monitor_loop(self, application):
-        """حلقة المراقبة التلقائية"""
+        """حلقة المراقبة التلقائية (مدة الانتظار يحددها poll_scheduler)"""
         logger.info("🔄 بدء المراقبة التلقائية")
         
         while True:
             try:
                 if is_monitoring_active():
-                    await self._check_new_posts(application)
-                
-                await asyncio.sleep(MONITORING_INTERVAL)
+                    with CHECK_SECONDS.time(), profiler.trace("check", profile=True):
+                        new_count = await self._check_new_posts(application)
+                    if new_count is None:
+                        CHECKS.inc(result="error")
+                        poll_scheduler.record_error()
+                    else:
+                        CHECKS.inc(result="new" if new_count else "empty")
+                        NEW_POSTS.inc(new_count)
+                        poll_scheduler.record_success(new_count)
                 
             except Exception as e:
                 logger.error(f"❌ خطأ في المراقبة: {e}")
-                await asyncio.sleep(15)
+                CHECKS.inc(result="error")
+                poll_scheduler.record_error()
+            
+            await asyncio.sleep(poll_scheduler.next_delay())
     
     async def _check_new_posts(self, application):
-        """فحص المنشورات الجديدة"""
-        recent_posts, _ = fetch_posts()
-        new_posts = [p for p in recent_posts if p["id"] not in self.last_sent_ids]
+        """فحص المنشورات الجديدة - يعيد عددها أو None عند فشل الجلب"""
+        # نتيجة حديثة فقط، مع مشاركة أي جلب جارٍ من طلبات المستخدمين
+        with profiler.span("post_cache.get"):
+            result = await post_cache.get(allow_stale=False)
+        if not result.ok:
+            return None
+        
+        if result.is_unchanged_since(self.last_digest):
+            logger.info("ℹ️ لا توجد منشورات جديدة (الصفحة لم تتغير)")
+            return 0
+        
+        with profiler.span("collect_candidates"):
+            candidates, complete = await self._collect_candidates(result)
+        new_posts = [
+            p for p in candidates
+            if p.id not in self.sent_ids and p.id not in self.in_flight_ids
+        ]
         
         if new_posts:
             logger.info(f"📢 {len(new_posts)} منشور جديد")
-            message = format_new_posts_alert(new_posts)
-            
-            if message:
-                try:
-                    await application.bot.send_message(
-                        chat_id=ALLOWED_USER_ID,
-                        text=message,
-                        parse_mode="Markdown",
-                        disable_web_page_preview=True
-                    )
-                    
-                    # حفظ معرفات المنشورات المرسلة في الإعدادات
-                    for post in new_posts:
-                        self.last_sent_ids.add(post["id"])
-                        settings_manager.add_sent_id(post["id"])
-                    
-                    logger.info(f"✅ تم إرسال {len(new_posts)} منشور")
-                    
-                except NetworkError:
-                    logger.warning("⚠️ خطأ شبكة مؤقت أثناء الإرسال - سيتم المحاولة لاحقاً")
-                except TelegramError as e:
-                    logger.error(f"❌ خطأ تليجرام: {e}")
-                except Exception as e:
-                    logger.error(f"❌ خطأ غير متوقع في الإرسال: {e}")
+            for post in new_posts:
+                latency_tracker.seen(post, result.fetched_at)
+            with profiler.span("fan_out"):
+                self._fan_out(new_posts)
         else:
             logger.info("ℹ️ لا توجد منشورات جديدة")
+        
+        # عند تعذر جلب صفحة لاحقة يبقى المؤشر مكانه لإعادة المحاولة في الدورة التالية
+        if complete:
+            self._advance_cursor(result.all_posts)
+            self.last_digest = result.digest
+        return len(new_posts)
+    
+    async def _collect_candidates(self, result):
+        """المنشورات الأحدث من المؤشر المحفوظ (مع تتبع الصفحات التالية عند الحاجة)"""
+        last_seen = settings_manager.get_last_seen_post()
+        if last_seen is None:
+            # أول تشغيل: لا مؤشر بعد، نكتفي بالمنشورات الحديثة
+            return result.recent_posts, True
+        return await fetch_posts_since(last_seen, result.all_posts)
+    
+    def _advance_cursor(self, posts):
+        """حفظ رقم أحدث منشور في الصفحة الأولى"""
+        numbers = [n for n in (post_number(p.id) for p in posts) if n is not None]
+        if numbers:
+            last_seen = settings_manager.get_last_seen_post() or 0
+            settings_manager.set_last_seen_post(max(max(numbers), last_seen))
+    
+    def _subscribers(self):
+        """المستخدمون المعتمدون الذين لم يوقفوا تنبيهاتهم"""
+        return (user_manager.get_approved_ids() | {ALLOWED_USER_ID}) - settings_manager.muted_users
+    
+    def _fan_out(self, new_posts):
+        """وضع التنبيهات في طابور الإرسال - كل مجموعة تستحق نفس المنشورات تُنسّق مرة واحدة"""
+        deliveries = {post.id: [] for post in new_posts}
+        messages = 0
+        
+        with profiler.span("route"):
+            groups = subscription_index.route(new_posts, self._subscribers())
+        
+        for posts, user_ids in groups:
+            # قد ينقسم التنبيه لعدة رسائل إذا تجاوز حد طول تليجرام
+            with profiler.span("format"):
+                chunks = format_new_posts_alert(posts)
+            for message, message_posts in chunks:
+                post_ids = [post.id for post in message_posts]
+                for post_id in post_ids:
+                    latency_tracker.mark(post_id, RENDERED)
+                
+                with profiler.span("enqueue"):
+                    for user_id in user_ids:
+                        future = send_queue.enqueue(
+                            user_id,
+                            message,
+                            parse_mode=PARSE_MODE,
+                            disable_web_page_preview=True
+                        )
+                        future.add_done_callback(partial(_record_delivery, post_ids))
+                        messages += 1
+                        for post in message_posts:
+                            deliveries[post.id].append(future)
+                
+                for post_id in post_ids:
+                    latency_tracker.mark(post_id, ENQUEUED)
+        
+        logger.info(f"📮 تم وضع {messages} رسالة في طابور الإرسال")
+        self.in_flight_ids.update(deliveries)
+        # يُؤجَّل حفظ تتبع الدورة حتى حسم التسليم ليشمل زمن الإرسال لتليجرام
+        release_trace = profiler.hold()
+        task = asyncio.create_task(self._confirm_delivery(new_posts, deliveries))
+        self._delivery_tasks.add(task)
+        # التنظيف في callback لأن المهمة الملغاة قبل بدئها لا تنفذ finally
+        task.add_done_callback(partial(self._delivery_finished, deliveries, release_trace))
+    
+    async def _confirm_delivery(self, new_posts, deliveries):
+        """تسجيل المنشورات كمرسلة فقط بعد حسم مصير كل رسائلها (تسليم أو رسائل ميتة)
+
+        المنشور الذي انتهت كل رسائله في الرسائل الميتة يُسجل كمرسل عمداً: نص التنبيه
+        محفوظ في ملف الرسائل الميتة، وإعادة إرساله في كل دورة تكرر نفس الفشل الدائم
+        (مستخدم حظر البوت مثلاً). يُحسب في UNDELIVERED_POSTS لمتابعته.
+        """
+        confirmed_ids = []
+        try:
+            for post in new_posts:
+                results = await asyncio.gather(*deliveries[post.id])
+                confirmed_ids.append(post.id)
+                
+                if not any(results):
+                    latency_tracker.discard(post.id)
+                if results and not any(results):
+                    UNDELIVERED_POSTS.inc()
+                    logger.warning(f"⚠️ لم يتم تسليم المنشور {post.id} لأي مستخدم - محفوظ في الرسائل الميتة")
+            
+            logger.info(f"✅ تم تأكيد تسليم {len(new_posts)} منشور")
+        except Exception as e:
+            logger.error(f"❌ خطأ في تأكيد التسليم: {e}")
+        finally:
+            # حفظ معرفات المنشورات المرسلة في الإعدادات دفعة واحدة
+            settings_manager.add_sent_ids(confirmed_ids)
+    
+    def _delivery_finished(self, deliveries, release_trace, task):
+        """إزالة المنشورات من قائمة الانتظار وتحرير تتبع الدورة عند انتهاء مهمة التأكيد"""
+        self._delivery_tasks.discard(task)
+        self.in_flight_ids.difference_update(deliveries)
+        release_trace()
+    
+    async def stop(self):
+        """إلغاء مهام تأكيد التسليم المعلقة (قبل إيقاف طابور الإرسال حتى لا تنتظر للأبد)"""
+        tasks = list(self._delivery_tasks)
+        for task in tasks:
+            task.cancel()
+        # عند الإلغاء تحفظ كل مهمة ما تأكد تسليمه، و_delivery_finished يحرر تتبع دورتها
+        await asyncio.gather(*tasks, return_exceptions=True)
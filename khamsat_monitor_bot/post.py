@@ -0,0 +1,82 @@
+import re
+from categories import CATEGORIES, category_names
+
+_POST_NUMBER_RE = re.compile(r"\d+")
+
+def post_number(post_id):
+    """الرقم التسلسلي لمعرف المنشور (forum_post-123 -> 123) - None إذا لم يوجد"""
+    match = _POST_NUMBER_RE.search(str(post_id))
+    return int(match.group()) if match else None
+
+class Post:
+    """منشور طلب من خمسات بحقول ثابتة وفئات مخزنة كقناع بتات
+
+    يدعم post["title"] و post.get("title") للتوافق مع الكود الذي يتعامل مع القواميس.
+    """
+
+    __slots__ = ("id", "title", "link", "username", "time_text", "timestamp", "posted_at", "category_mask")
+
+    # مفاتيح العرض كقاموس (بنفس ترتيب القاموس القديم)
+    KEYS = (
+        "id", "title", "link", "username", "time_text", "timestamp", "posted_at",
+        "categories", "primary_category", "primary_icon"
+    )
+
+    def __init__(self, id, title, link, username, time_text, timestamp="", posted_at=None, category_mask=0):
+        self.id = id
+        self.title = title
+        self.link = link
+        self.username = username
+        self.time_text = time_text
+        self.timestamp = timestamp
+        self.posted_at = posted_at
+        self.category_mask = category_mask
+
+    @property
+    def categories(self):
+        """أسماء الفئات بترتيب CATEGORIES"""
+        return category_names(self.category_mask)
+
+    @property
+    def primary_category(self):
+        categories = self.categories
+        return categories[0] if categories else "أخرى"
+
+    @property
+    def primary_icon(self):
+        return CATEGORIES[self.primary_category]["icon"]
+
+    def matches(self, mask):
+        """هل يقع المنشور في إحدى فئات القناع"""
+        return bool(self.category_mask & mask)
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def keys(self):
+        return self.KEYS
+
+    def to_dict(self):
+        """نسخة قاموس كاملة (للتسجيل أو الحفظ)"""
+        post = {key: getattr(self, key) for key in self.KEYS}
+        post["categories"] = list(post["categories"])
+        return post
+
+    def _fields(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, Post):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"Post(id={self.id!r}, title={self.title!r}, categories={self.categories!r})"
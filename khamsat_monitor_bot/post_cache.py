@@ -0,0 +1,84 @@
+import asyncio
+import time
+from config import logger, POSTS_CACHE_TTL, POSTS_CACHE_STALE_TTL
+from categories import add_reload_listener
+from scraper import fetch_listing, FetchResult
+
+class PostCache:
+    """ذاكرة مؤقتة مشتركة لنتائج الجلب مع دمج الطلبات المتزامنة في جلب واحد"""
+
+    def __init__(self, ttl=POSTS_CACHE_TTL, stale_ttl=POSTS_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._result = None
+        self._fetched_at = 0.0
+        self._inflight = None
+        self.stats = {"hits": 0, "stale_hits": 0, "fetches": 0, "coalesced": 0, "errors": 0}
+
+    def _age(self):
+        """عمر النتيجة المخزنة بالثواني"""
+        return time.monotonic() - self._fetched_at
+
+    async def get(self, allow_stale=True):
+        """الحصول على نتيجة الجلب (FetchResult) من الذاكرة أو بجلب جديد
+
+        عند فشل الجلب: allow_stale=True تعيد آخر نتيجة محفوظة (لعرضها للمستخدم)،
+        و allow_stale=False تعيد نتيجة ERROR حتى يسجل المراقب الفشل.
+        """
+        if self._result is not None:
+            age = self._age()
+            if age <= self.ttl:
+                self.stats["hits"] += 1
+                return self._result
+            
+            # النتيجة قديمة لكن مقبولة: نعيدها ونحدّث في الخلفية
+            if allow_stale and age <= self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                self._start_fetch()
+                return self._result
+        
+        result = await self.refresh()
+        if not result.ok and allow_stale and self._result is not None:
+            logger.warning("⚠️ تعذر التحديث - سيتم استخدام آخر نتيجة محفوظة")
+            return self._result
+        return result
+
+    async def refresh(self):
+        """فرض جلب جديد (أو الانضمام لجلب جارٍ بالفعل)"""
+        task = self._start_fetch()
+        # shield حتى لا يُلغى الجلب المشترك إذا أُلغي أحد المنتظرين
+        return await asyncio.shield(task)
+
+    def invalidate(self):
+        """إبطال النتيجة المخزنة"""
+        self._result = None
+        self._fetched_at = 0.0
+
+    def _start_fetch(self):
+        """بدء جلب جديد إذا لم يكن هناك جلب جارٍ"""
+        if self._inflight is None:
+            self.stats["fetches"] += 1
+            self._inflight = asyncio.ensure_future(self._fetch())
+        else:
+            self.stats["coalesced"] += 1
+        return self._inflight
+
+    async def _fetch(self):
+        """تنفيذ الجلب الفعلي وتخزين النتيجة - نتيجة ERROR عند الفشل"""
+        try:
+            result = await fetch_listing()
+            if result.ok:
+                self._result = result
+                self._fetched_at = time.monotonic()
+                return result
+            self.stats["errors"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"❌ خطأ في جلب المنشورات: {e}")
+        finally:
+            self._inflight = None
+        return FetchResult(FetchResult.ERROR)
+
+# إنشاء مثيل مشترك (منشوراته المحفوظة تحمل أقنعة فئات بالترتيب القديم بعد تغيير الجدول)
+post_cache = PostCache()
+add_reload_listener(post_cache.invalidate)
@@ -0,0 +1,319 @@
+import contextvars
+import cProfile
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+from config import (
+    logger, PROFILING_ENABLED, PROFILE_SLOW_THRESHOLD, PROFILE_TRACE_FILE,
+    PROFILE_TRACE_MAX_BYTES, PROFILE_TRACE_BACKUPS, PROFILE_CPROFILE_TOP, PROFILE_CPROFILE_DIR
+)
+from metrics import registry
+
+SLOW_TRACES = registry.counter(
+    "khamsat_slow_traces_total", "Traced check cycles or handlers slower than the profiling threshold", ("trace",)
+)
+
+# المرحلة الحالية في سياق المهمة (تنتقل تلقائياً للمهام والخيوط المنشأة داخلها)
+_current_span = contextvars.ContextVar("profile_span", default=None)
+
+class _NullSpan:
+    """مرحلة فارغة عند تعطيل التحليل أو خارج أي تتبع"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+def _noop():
+    pass
+
+class Span:
+    """عقدة في شجرة التتبع - التكرارات بنفس الاسم تحت نفس الأب تُجمع في عقدة واحدة
+
+    المراحل المؤجلة (span_in) تعمل بعد إغلاق أبيها، فتُعرض منفصلة ولا تُطرح من زمنه.
+    """
+    __slots__ = ("name", "trace", "count", "wall", "cpu", "children", "deferred")
+
+    def __init__(self, name, trace, deferred=False):
+        self.name = name
+        self.trace = trace
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.children = {}
+        self.deferred = deferred
+
+    def child(self, name, deferred=False):
+        key = (name, deferred)
+        node = self.children.get(key)
+        if node is None:
+            node = self.children[key] = Span(name, self.trace, deferred)
+        return node
+
+    def add(self, wall, cpu):
+        self.count += 1
+        self.wall += wall
+        self.cpu += cpu
+
+    def walk(self):
+        """العقدة وكل أحفادها"""
+        yield self
+        for node in self.children.values():
+            yield from node.walk()
+
+    def to_dict(self):
+        """العقدة وأبناؤها مرتبين من الأبطأ (self_ms = الزمن غير المنسوب لأي مرحلة فرعية متزامنة)"""
+        nodes = sorted(self.children.values(), key=lambda node: node.wall, reverse=True)
+        children = [node for node in nodes if not node.deferred]
+        deferred = [node for node in nodes if node.deferred]
+        data = {
+            "name": self.name,
+            "count": self.count,
+            "wall_ms": round(self.wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            # المراحل الفرعية المتوازية (gather) قد يتجاوز مجموعها زمن الأب
+            "self_ms": round(max(0.0, self.wall - sum(node.wall for node in children)) * 1000, 3),
+        }
+        if children:
+            data["children"] = [node.to_dict() for node in children]
+        if deferred:
+            data["deferred"] = [node.to_dict() for node in deferred]
+        return data
+
+class _SpanTimer:
+    """قياس مرحلة واحدة: الزمن الفعلي وزمن المعالج للخيط الحالي"""
+    __slots__ = ("node", "token", "wall", "cpu")
+
+    def __init__(self, node):
+        self.node = node
+
+    def __enter__(self):
+        self.token = _current_span.set(self.node)
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self.node
+
+    def __exit__(self, *exc):
+        self.node.add(time.perf_counter() - self.wall, time.thread_time() - self.cpu)
+        _current_span.reset(self.token)
+        return False
+
+class Trace:
+    """تتبع دورة فحص أو استدعاء معالج واحد"""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.elapsed = None  # من البداية حتى انتهاء آخر عمل مؤجل (يُحسب عند الاكتمال)
+        self.root = Span(name, self)
+        self.profile_path = None
+        self.finished = False
+        self._holds = 0
+        self._on_complete = None
+
+    def hold(self):
+        """تأجيل كتابة التتبع حتى انتهاء عمل غير متزامن تابع له - تعيد دالة الإفلات"""
+        self._holds += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._holds -= 1
+            if self.finished and not self._holds:
+                self._on_complete(self)
+
+        return release
+
+    def to_dict(self):
+        return {
+            "trace": self.name,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"),
+            "attrs": self.attrs,
+            "wall_ms": round(self.root.wall * 1000, 3),
+            "elapsed_ms": round((self.elapsed or self.root.wall) * 1000, 3),
+            "cpu_ms": round(self.root.cpu * 1000, 3),
+            "profile": self.profile_path,
+            "spans": self.root.to_dict(),
+        }
+
+class Profiler:
+    """وضع تحليل اختياري (PROFILING_ENABLED) لمعرفة أي مرحلة أبطأت دورة الفحص
+
+    - كل دورة فحص وكل استدعاء معالج تتبعٌ بشجرة مراحل (جلب، تحليل، تصنيف، حفظ، إرسال).
+    - التتبعات الأبطأ من PROFILE_SLOW_THRESHOLD تُكتب كسطر JSON في ملف يُدوَّر حسب الحجم.
+    - مع PROFILE_CPROFILE_TOP > 0 تُحلَّل دورات الفحص بـ cProfile ويُحفظ ملف .prof لأبطأ N منها.
+
+    زمن المعالج يُقاس للخيط الحالي، لذا يشمل المهام الأخرى التي تعمل أثناء await
+    داخل المرحلة، وكذلك cProfile يشمل كل ما ينفذه الخيط أثناء الدورة.
+    عند التعطيل تعيد span مرحلة فارغة مشتركة ولا يُضاف أي مغلف للمعالجات.
+    """
+
+    def __init__(self, enabled=PROFILING_ENABLED, slow_threshold=PROFILE_SLOW_THRESHOLD,
+                 trace_file=PROFILE_TRACE_FILE, cprofile_top=PROFILE_CPROFILE_TOP,
+                 cprofile_dir=PROFILE_CPROFILE_DIR):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.trace_file = trace_file
+        self.cprofile_top = cprofile_top
+        self.cprofile_dir = cprofile_dir
+        self._writer = None
+        self._profiling = False
+        self._slowest = []  # كومة [(الزمن، تسلسل، مسار ملف .prof)] لأبطأ الدورات
+        self._sequence = itertools.count()
+        self.stats = {"traces": 0, "slow": 0, "profiles_kept": 0}
+
+    @contextmanager
+    def trace(self, name, profile=False, **attrs):
+        """بدء تتبع جديد (جذر الشجرة) - profile=True لتحليل الدورة بـ cProfile"""
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name, attrs)
+        trace._on_complete = self._complete
+        profile = self._start_profile() if profile else None
+        token = _current_span.set(trace.root)
+        cpu = time.thread_time()
+        try:
+            yield trace
+        finally:
+            trace.root.add(time.perf_counter() - trace.started, time.thread_time() - cpu)
+            _current_span.reset(token)
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+                self._keep_profile(trace, profile)
+            self._finish(trace)
+
+    def span(self, name):
+        """مرحلة فرعية تحت المرحلة الحالية (لا شيء خارج أي تتبع)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        parent = _current_span.get()
+        if parent is None:
+            return _NULL_SPAN
+        return _SpanTimer(parent.child(name))
+
+    def span_in(self, parent, name):
+        """مرحلة مؤجلة تحت عقدة محفوظة مسبقاً (لعمل يُنفذ لاحقاً في مهمة أخرى كطابور الإرسال)"""
+        if parent is None:
+            return _NULL_SPAN
+        return _SpanTimer(parent.child(name, deferred=True))
+
+    def current_span(self):
+        """المرحلة الحالية لحفظها مع عمل مؤجل - None عند التعطيل"""
+        return _current_span.get() if self.enabled else None
+
+    def hold(self):
+        """تأجيل كتابة التتبع الحالي حتى استدعاء الدالة المعادة"""
+        span = self.current_span()
+        return span.trace.hold() if span is not None else _noop
+
+    def _finish(self, trace):
+        """نهاية الجزء المتزامن من التتبع"""
+        trace.finished = True
+        self.stats["traces"] += 1
+        if not trace._holds:
+            self._complete(trace)
+
+    def _complete(self, trace):
+        """فحص الزمن الكلي (مع العمل المؤجل كالإرسال لتليجرام) وكتابة التتبع البطيء"""
+        trace.elapsed = max(trace.root.wall, time.perf_counter() - trace.started)
+        if trace.elapsed < self.slow_threshold:
+            return
+        self.stats["slow"] += 1
+        SLOW_TRACES.inc(trace=trace.name)
+        # المراحل الرئيسية والمؤجلة (أينما أُضيفت) هي المرشحة لتفسير البطء
+        stages = [*trace.root.children.values(), *(node for node in trace.root.walk() if node.deferred)]
+        slowest = max(stages, key=lambda node: node.wall, default=None)
+        stage = f" - أبطأ مرحلة: {slowest.name} ({slowest.wall:.2f} ثانية)" if slowest else ""
+        logger.warning(f"🐢 {trace.name} استغرق {trace.elapsed:.2f} ثانية{stage}")
+        try:
+            record = logging.makeLogRecord({"msg": json.dumps(trace.to_dict(), ensure_ascii=False)})
+            self._trace_handler().handle(record)
+        except Exception as e:
+            logger.error(f"❌ خطأ في كتابة ملف التتبع: {e}")
+
+    def _trace_handler(self):
+        """ملف التتبع (سطر JSON لكل تتبع) مع التدوير حسب الحجم - مستقل عن إعدادات التسجيل"""
+        if self._writer is None:
+            self._writer = RotatingFileHandler(
+                self.trace_file, maxBytes=PROFILE_TRACE_MAX_BYTES,
+                backupCount=PROFILE_TRACE_BACKUPS, encoding="utf-8", delay=True
+            )
+            self._writer.setFormatter(logging.Formatter("%(message)s"))
+        return self._writer
+
+    def _start_profile(self):
+        """تشغيل cProfile إذا كان مفعلاً ولا يوجد تحليل آخر جارٍ"""
+        if self.cprofile_top <= 0 or self._profiling:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # أداة تحليل أخرى تعمل بالفعل على هذا الخيط
+            return None
+        self._profiling = True
+        return profile
+
+    def _keep_profile(self, trace, profile):
+        """حفظ تحليل الدورة إذا كانت ضمن أبطأ cprofile_top دورة وحذف ما خرج منها"""
+        wall = trace.root.wall
+        if len(self._slowest) >= self.cprofile_top and wall <= self._slowest[0][0]:
+            return
+        try:
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            name = trace.name.replace(":", "_")
+            path = os.path.join(
+                self.cprofile_dir, f"{name}-{datetime.now():%Y%m%d-%H%M%S}-{int(wall * 1000)}ms.prof"
+            )
+            profile.dump_stats(path)
+        except Exception as e:
+            logger.error(f"❌ خطأ في حفظ ملف التحليل: {e}")
+            return
+
+        trace.profile_path = path
+        self.stats["profiles_kept"] += 1
+        heapq.heappush(self._slowest, (wall, next(self._sequence), path))
+        if len(self._slowest) > self.cprofile_top:
+            _, _, old_path = heapq.heappop(self._slowest)
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def slowest_profiles(self):
+        """ملفات .prof المحفوظة من الأبطأ للأسرع [(الزمن بالثواني، المسار)]"""
+        return [(wall, path) for wall, _, path in sorted(self._slowest, reverse=True)]
+
+# إنشاء مثيل مشترك
+profiler = Profiler()
+
+def profiled(func):
+    """تتبع كل استدعاء لمعالج تليجرام (المعالج يُعاد كما هو عند تعطيل التحليل)"""
+    if not profiler.enabled:
+        return func
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with profiler.trace(f"handler:{func.__name__}"):
+            return await func(*args, **kwargs)
+
+    return wrapper
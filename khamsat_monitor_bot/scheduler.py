@@ -0,0 +1,84 @@
+import math
+import random
+import time
+from config import (
+    logger, MONITORING_INTERVAL, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL,
+    POLL_TARGET_POSTS, POLL_QUIET_BACKOFF, POLL_RATE_WINDOW, POLL_JITTER
+)
+from metrics import registry
+
+class AdaptiveScheduler:
+    """تحديد مدة الانتظار بين دورات الفحص حسب نشاط الموقع
+
+    - معدل وصول المنشورات متوسط متحرك أُسّي (EWMA) على نافذة POLL_RATE_WINDOW.
+    - المدة المستهدفة = POLL_TARGET_POSTS / المعدل (عدد ثابت تقريباً من المنشورات لكل دورة).
+    - عند وصول منشورات: المدة تقصر فوراً (بمعامل POLL_QUIET_BACKOFF أو للمدة المستهدفة).
+    - عند الهدوء: المدة تزيد تدريجياً بنفس المعامل حتى المدة المستهدفة.
+    - عند الأخطاء: تراجع أُسّي من المدة الحالية حتى الحد الأقصى.
+    """
+
+    def __init__(self, min_interval=POLL_MIN_INTERVAL, max_interval=POLL_MAX_INTERVAL,
+                 initial_interval=MONITORING_INTERVAL, target_posts=POLL_TARGET_POSTS,
+                 quiet_backoff=POLL_QUIET_BACKOFF, rate_window=POLL_RATE_WINDOW, jitter=POLL_JITTER):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_posts = target_posts
+        self.quiet_backoff = quiet_backoff
+        self.rate_window = rate_window
+        self.jitter = jitter
+        self.interval = self._clamp(initial_interval)
+        self.arrival_rate = 0.0  # منشور في الثانية
+        self.consecutive_errors = 0
+        self._last_check = None
+
+    def _clamp(self, seconds):
+        return max(self.min_interval, min(self.max_interval, seconds))
+
+    def record_success(self, new_posts, now=None):
+        """تسجيل دورة فحص ناجحة وعدد المنشورات الجديدة فيها"""
+        now = time.monotonic() if now is None else now
+        self.consecutive_errors = 0
+        if self._last_check is not None:
+            elapsed = max(now - self._last_check, 1e-3)
+            weight = 1 - math.exp(-elapsed / self.rate_window)
+            self.arrival_rate += weight * (new_posts / elapsed - self.arrival_rate)
+        self._last_check = now
+
+        rate_interval = self.target_posts / self.arrival_rate if self.arrival_rate > 0 else self.max_interval
+        if new_posts:
+            self.interval = self._clamp(min(self.interval / self.quiet_backoff, rate_interval))
+        else:
+            # هدوء: إبطاء تدريجي دون تجاوز ما يقتضيه المعدل الملحوظ
+            self.interval = self._clamp(min(self.interval * self.quiet_backoff, max(rate_interval, self.interval)))
+
+    def record_error(self):
+        """تسجيل دورة فحص فاشلة"""
+        self.consecutive_errors += 1
+
+    def current_delay(self):
+        """مدة الانتظار الحالية قبل العشوائية"""
+        if self.consecutive_errors:
+            base = max(self.interval, self.min_interval)
+            return self._clamp(base * 2 ** (self.consecutive_errors - 1))
+        return self.interval
+
+    def next_delay(self):
+        """مدة الانتظار قبل الدورة التالية مع عشوائية لتجنب التزامن"""
+        delay = self.current_delay() * random.uniform(1 - self.jitter, 1 + self.jitter)
+        logger.debug(f"⏱️ الفحص التالي بعد {delay:.1f} ثانية")
+        return delay
+
+    def get_stats(self):
+        """المدة الحالية ومعدل وصول المنشورات (في الدقيقة)"""
+        return {
+            "interval": self.current_delay(),
+            "arrival_rate_per_minute": self.arrival_rate * 60,
+            "consecutive_errors": self.consecutive_errors
+        }
+
+# إنشاء مثيل مشترك
+poll_scheduler = AdaptiveScheduler()
+registry.gauge("khamsat_poll_interval_seconds", "Current delay between monitor checks",
+               callback=poll_scheduler.current_delay)
+registry.gauge("khamsat_post_arrival_rate", "Observed new posts per minute",
+               callback=lambda: poll_scheduler.arrival_rate * 60)
@@ -1,96 +1,440 @@
-import requests
-from requests.exceptions import RequestException, Timeout, ConnectionError
-from bs4 import BeautifulSoup
-from datetime import datetime, timezone
-from categories import classify_post, CATEGORIES
-from config import logger, MAX_POST_AGE_MINUTES
+import asyncio
+import hashlib
+import re
+import time
+import httpx
+from bs4 import BeautifulSoup, SoupStrainer, FeatureNotFound
+from datetime import datetime, timedelta, timezone
+from categories import classify_post_mask, refresh_categories, add_reload_listener
+from lru import LRUCache, MISSING
+from post import Post, post_number
+from profiler import profiler
+from metrics import (
+    FETCH_SECONDS, FETCH_RESPONSES, FETCH_ERRORS, FETCH_RESULTS, PARSE_SECONDS,
+    POSTS_EXTRACTED, POST_EXTRACT_FAILURES, TIMESTAMP_FAILURES
+)
+from html_extractor import extract_post_rows
+from config import (
+    logger, MAX_POST_AGE_MINUTES, KHAMSAT_BASE_URL, REQUESTS_PATH,
+    FETCH_TIMEOUT, FETCH_CONNECT_TIMEOUT, FETCH_MAX_CONNECTIONS,
+    FETCH_KEEPALIVE_CONNECTIONS, FETCH_CONCURRENCY, FETCH_MAX_PAGES, CATCH_UP_MAX_AGE_MINUTES,
+    PARSER_BACKEND, CLASSIFY_CACHE_SIZE
+)
+
+REQUEST_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# عميل HTTP مشترك (اتصالات keep-alive) مرتبط بحلقة الأحداث التي أنشأته
+_client = None
+_client_loop = None
+_fetch_semaphore = None
+
+def _create_client():
+    """إنشاء عميل HTTP غير متزامن مع تجمع اتصالات"""
+    return httpx.AsyncClient(
+        headers=REQUEST_HEADERS,
+        timeout=httpx.Timeout(FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=FETCH_MAX_CONNECTIONS,
+            max_keepalive_connections=FETCH_KEEPALIVE_CONNECTIONS
+        ),
+        follow_redirects=True
+    )
+
+def get_http_client():
+    """الحصول على العميل المشترك وإنشاؤه عند الحاجة"""
+    global _client, _client_loop, _fetch_semaphore
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _create_client()
+        _client_loop = loop
+        _fetch_semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    return _client
+
+async def close_http_client():
+    """إغلاق العميل المشترك عند إيقاف البوت"""
+    global _client, _client_loop, _fetch_semaphore
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+    _fetch_semaphore = None
+
+# الصيغة الثابتة لوقت النشر في خمسات: "dd/mm/YYYY HH:MM:SS GMT"
+_TIMESTAMP_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})\s+(\d{1,2}):(\d{2}):(\d{2})")
+
+# أوقات النشر المحللة بمفتاح (معرف المنشور، النص) - None للأوقات التي تعذر تحليلها
+_posted_at_cache = LRUCache(CLASSIFY_CACHE_SIZE)
+_timestamp_stats = {"parsed": 0, "failures": 0}
+
+def _parse_timestamp_text(text):
+    """تحليل سريع بالمواقع الثابتة مع بديل regex للأرقام ذات الخانة الواحدة
+
+    المسار السريع يقبل فقط ما يقبله _TIMESTAMP_RE: int() وحده يتجاهل المسافات
+    والإشارات (" 5" أو "+5") فيقبل نصوصاً يرفضها التعبير المنتظم.
+    """
+    if (len(text) >= 19 and text[2] == "/" and text[5] == "/" and text[10].isspace()
+            and text[13] == ":" and text[16] == ":"
+            and (text[0:2] + text[3:5] + text[6:10] + text[11:13] + text[14:16] + text[17:19]).isdigit()):
+        return datetime(
+            int(text[6:10]), int(text[3:5]), int(text[0:2]),
+            int(text[11:13]), int(text[14:16]), int(text[17:19]),
+            tzinfo=timezone.utc
+        )
+    match = _TIMESTAMP_RE.search(text)
+    if not match:
+        raise ValueError(f"صيغة وقت غير معروفة: {text!r}")
+    day, month, year, hour, minute, second = map(int, match.groups())
+    return datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
+
+def parse_timestamp(timestamp_str, post_id=None):
+    """تحويل وقت النشر إلى datetime بتوقيت UTC (مرة واحدة لكل منشور) - None عند الفشل"""
+    if not timestamp_str:
+        return None
+    key = (post_id, timestamp_str)
+    cached = _posted_at_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    
+    try:
+        posted_at = _parse_timestamp_text(timestamp_str.strip())
+        _timestamp_stats["parsed"] += 1
+    except ValueError as e:
+        # تُخزن None حتى لا يتكرر التحليل والتسجيل لنفس المنشور
+        posted_at = None
+        _timestamp_stats["failures"] += 1
+        TIMESTAMP_FAILURES.inc()
+        logger.warning(f"⚠️ تعذر تحليل وقت المنشور {post_id}: {e}")
+    _posted_at_cache.put(key, posted_at)
+    return posted_at
+
+def get_timestamp_stats():
+    """إحصائيات تحليل أوقات النشر"""
+    cache = _posted_at_cache.stats()
+    return {**_timestamp_stats, "cache_hits": cache["hits"], "cache_size": cache["size"]}
+
+def is_recent(posted_at, now=None, max_minutes=MAX_POST_AGE_MINUTES):
+    """مقارنة وقت نشر محلل مع "الآن" (يُحسب مرة واحدة لكل دورة فحص)"""
+    if posted_at is None:
+        return False
+    now = now or datetime.now(timezone.utc)
+    return now - posted_at <= timedelta(minutes=max_minutes)
 
 def is_recent_post(timestamp_str, max_minutes=MAX_POST_AGE_MINUTES):
     """فحص إذا كان المنشور حديث"""
+    return is_recent(parse_timestamp(timestamp_str), max_minutes=max_minutes)
+
+class FetchResult:
+    """نتيجة عملية جلب واحدة لصفحة الطلبات"""
+    OK = "ok"
+    UNCHANGED = "unchanged"
+    ERROR = "error"
+
+    def __init__(self, status, recent_posts=None, all_posts=None, digest=None):
+        self.status = status
+        self.recent_posts = recent_posts if recent_posts is not None else []
+        self.all_posts = all_posts if all_posts is not None else []
+        self.digest = digest
+        self.fetched_at = time.time()  # وقت الجلب (أول ظهور المنشورات)
+
+    @property
+    def ok(self):
+        """هل تم الحصول على منشورات (جديدة أو محفوظة)"""
+        return self.status != self.ERROR
+
+    def is_unchanged_since(self, digest):
+        """فحص إذا كانت الصفحة لم تتغير منذ البصمة المعطاة"""
+        return self.ok and digest is not None and self.digest == digest
+
+    def as_tuple(self):
+        """الصيغة القديمة (المنشورات الحديثة، كل المنشورات)"""
+        return self.recent_posts, self.all_posts
+
+# حالة كل صفحة: مُعرّفات التحقق (ETag/Last-Modified) وبصمة الصفوف وآخر نتيجة
+_page_states = {}
+
+def _forget_parsed_pages():
+    """نسيان نتائج الصفحات المحللة بعد تغيير جدول الفئات (أقنعتها بالترتيب القديم)
+
+    يُفرَّغ كل قاموس حالة في مكانه، فالجلب الجاري يكمل بنتيجته الجديدة المحللة بالجدول الجديد.
+    """
+    for state in _page_states.values():
+        state.clear()
+
+add_reload_listener(_forget_parsed_pages)
+
+# الوسم الافتتاحي لصف منشور (يحمل المعرف) - يكفي لمعرفة ظهور منشورات جديدة
+# قيمة class قد تكون بين علامتي تنصيص أو بدونها (class=forum_post)
+_POST_ROW_RE = re.compile(
+    r"<tr\b[^>]*\bclass=(?:\"[^\"]*|'[^']*|)(?<![\w-])forum_post(?![\w-])[^>]*>",
+    re.IGNORECASE
+)
+
+# يطابق قيمة class كاملة أيضاً لأن SoupStrainer يفحصها قبل تقسيمها
+_POST_CLASS_RE = re.compile(r"(?:^|\s)forum_post(?:\s|$)")
+
+def listing_digest(html, limit=10):
+    """بصمة منطقة صفوف المنشورات دون تحليل الصفحة كاملة
+
+    تعيد None إذا لم يُعثر على أي صف: بصمة نص فارغ ستتطابق مع كل جلب لاحق
+    (تغيّر في بنية الصفحة مثلاً) فتُعتبر الصفحة غير متغيرة للأبد.
+    """
+    rows = _POST_ROW_RE.findall(html)[:limit]
+    if not rows:
+        return None
+    return hashlib.blake2b("\n".join(rows).encode("utf-8"), digest_size=16).hexdigest()
+
+async def fetch_page(url, client=None, headers=None, page="1"):
+    """طلب GET لصفحة دون حجب حلقة الأحداث"""
     try:
-        timestamp_str = timestamp_str.replace(" GMT", "").strip()
-        post_time = datetime.strptime(timestamp_str, "%d/%m/%Y %H:%M:%S")
-        current_time = datetime.now(timezone.utc).replace(tzinfo=None)
-        minutes_diff = (current_time - post_time).total_seconds() / 60
-        return minutes_diff <= max_minutes
-    except Exception as e:
-        logger.debug(f"خطأ في تحليل الوقت: {e}")
-        return False
+        with FETCH_SECONDS.time(page=page), profiler.span(f"http:{page}"):
+            if client is None:
+                client = get_http_client()
+                async with _fetch_semaphore:
+                    response = await client.get(url, headers=headers)
+            else:
+                response = await client.get(url, headers=headers)
+    except Exception:
+        FETCH_ERRORS.inc()
+        raise
+    FETCH_RESPONSES.inc(code=response.status_code)
+    return response
 
-def fetch_posts():
-    """جلب المنشورات من خمسات"""
+def page_url(page=1):
+    """رابط صفحة من صفحات الطلبات"""
+    url = f"{KHAMSAT_BASE_URL}{REQUESTS_PATH}"
+    return url if page == 1 else f"{url}?page={page}"
+
+async def fetch_listing(client=None):
+    """جلب صفحة الطلبات وتحليلها فقط إذا تغيرت - يرفع استثناءات الشبكة
+
+    كل نتيجة (ok أو unchanged أو error، والاستثناءات كـ error) تُسجل في FETCH_RESULTS.
+    """
     try:
-        logger.info("🔍 جاري جلب المنشورات...")
-        
-        response = requests.get(
-            "https://khamsat.com/community/requests", 
-            headers={"User-Agent": "Mozilla/5.0"}, 
-            timeout=10
+        result = await _fetch_listing(client)
+    except Exception:
+        FETCH_RESULTS.inc(status=FetchResult.ERROR)
+        raise
+    FETCH_RESULTS.inc(status=result.status)
+    return result
+
+async def _fetch_listing(client):
+    url = page_url()
+    state = _page_states.setdefault(url, {})
+    logger.info("🔍 جاري جلب المنشورات...")
+
+    # إرسال مُعرّفات التحقق إذا كان الخادم يدعمها
+    headers = {}
+    if "result" in state:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+    response = await fetch_page(url, client, headers)
+
+    if response.status_code == 304 and "result" in state:
+        logger.info("ℹ️ الصفحة لم تتغير (304)")
+        return _unchanged_result(state)
+
+    if response.status_code != 200:
+        logger.error(f"❌ خطأ في الاستجابة: {response.status_code}")
+        return FetchResult(FetchResult.ERROR)
+
+    state["etag"] = response.headers.get("ETag")
+    state["last_modified"] = response.headers.get("Last-Modified")
+
+    html = response.text
+    digest = listing_digest(html)
+    if digest is not None and digest == state.get("digest") and "result" in state:
+        logger.info("ℹ️ لا تغيير في صفوف المنشورات - تم تخطي التحليل")
+        return _unchanged_result(state)
+
+    # التحليل يستهلك المعالج، لذا يتم في خيط منفصل
+    recent_posts, all_posts = await asyncio.to_thread(parse_posts, html)
+    state["digest"] = digest
+    state["result"] = (recent_posts, all_posts)
+    return FetchResult(FetchResult.OK, recent_posts, all_posts, digest)
+
+async def fetch_page_posts(page, client=None):
+    """جلب صفحة طلبات واحدة وتحليل كل صفوفها - None عند فشل الجلب"""
+    response = await fetch_page(page_url(page), client, page="next")
+    if response.status_code != 200:
+        logger.error(f"❌ خطأ في استجابة الصفحة {page}: {response.status_code}")
+        return None
+    return await asyncio.to_thread(extract_posts, response.text, None, None)
+
+async def fetch_posts_since(since_number, first_page_posts, client=None, max_pages=FETCH_MAX_PAGES,
+                            max_age_minutes=CATCH_UP_MAX_AGE_MINUTES):
+    """تتبع صفحات الطلبات حتى الوصول لآخر منشور معروف (since_number)
+
+    الصفحة الأولى محللة مسبقاً، والصفحات التالية تُجلب بالتوازي على دفعات.
+    المنشورات الأقدم من max_age_minutes لا تُجمع ويتوقف التتبع عندها
+    (بعد توقف طويل لا تُرسل منشورات قديمة).
+    تعيد (المنشورات الأحدث من since_number من الأحدث للأقدم، هل اكتمل اللحاق).
+    """
+    found = {}
+    now = datetime.now(timezone.utc)
+    
+    def too_old(post):
+        return post.posted_at is not None and not is_recent(post.posted_at, now, max_age_minutes)
+    
+    def collect(page_posts):
+        """إضافة منشورات صفحة - True إذا وصلت الصفحة لمنشورات معروفة أو قديمة"""
+        for post in page_posts:
+            number = post_number(post.id)
+            if number is not None and number > since_number and not too_old(post):
+                found.setdefault(post.id, post)
+        if not page_posts:
+            return True
+        # آخر صف هو الأقدم (المثبّتة القديمة قد تظهر في الأعلى)
+        last_number = post_number(page_posts[-1].id)
+        return last_number is None or last_number <= since_number or too_old(page_posts[-1])
+    
+    if collect(first_page_posts):
+        return list(found.values()), True
+    
+    page = 2
+    while page <= max_pages:
+        batch = range(page, min(page + FETCH_CONCURRENCY, max_pages + 1))
+        pages = await asyncio.gather(
+            *(fetch_page_posts(n, client) for n in batch), return_exceptions=True
         )
-        
-        if response.status_code != 200:
-            logger.error(f"❌ خطأ في الاستجابة: {response.status_code}")
-            return [], []
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        posts = soup.select("tr.forum_post")
-        recent_posts = []
-        all_posts = []
-
-        for post in posts[:10]:  # أول 10 مواضيع
-            post_data = extract_post_data(post)
-            if post_data:
-                all_posts.append(post_data)
-                
-                # فحص إذا كان حديث
-                if post_data['timestamp'] and is_recent_post(post_data['timestamp']):
-                    recent_posts.append(post_data)
-                    logger.info(f"✅ منشور حديث: {post_data['title'][:30]}...")
-
-        logger.info(f"✅ {len(recent_posts)} منشور حديث من أصل {len(all_posts)}")
-        return recent_posts, all_posts
-        
+        for number, page_posts in zip(batch, pages):
+            if isinstance(page_posts, Exception) or page_posts is None:
+                logger.error(f"❌ تعذر جلب الصفحة {number}: {page_posts}")
+                return list(found.values()), False
+            if collect(page_posts):
+                logger.info(f"📚 تم اللحاق بـ {len(found)} منشور عبر {number} صفحة")
+                return list(found.values()), True
+        page += len(batch)
+    
+    logger.warning(f"⚠️ تم بلوغ حد الصفحات ({max_pages}) قبل الوصول لآخر منشور معروف")
+    return list(found.values()), True
+
+def _unchanged_result(state):
+    """نتيجة "بدون تغيير" تحمل آخر منشورات محللة مع إعادة فحص حداثتها بوقت الآن"""
+    _, all_posts = state["result"]
+    now = datetime.now(timezone.utc)
+    recent_posts = [post for post in all_posts if is_recent(post.posted_at, now)]
+    return FetchResult(FetchResult.UNCHANGED, recent_posts, all_posts, state.get("digest"))
+
+async def fetch_posts_async(client=None):
+    """جلب المنشورات من خمسات بشكل غير متزامن"""
+    try:
+        return (await fetch_listing(client)).as_tuple()
     except Exception as e:
         logger.error(f"❌ خطأ في جلب المنشورات: {e}")
         return [], []
 
+async def _fetch_posts_once():
+    """جلب المنشورات بعميل مؤقت خاص بحلقة أحداث مستقلة"""
+    async with _create_client() as client:
+        return await fetch_posts_async(client)
+
+def fetch_posts():
+    """جلب المنشورات من خمسات (غلاف متزامن حول fetch_posts_async)"""
+    return asyncio.run(_fetch_posts_once())
+
+def _make_soup(html, backend):
+    """بناء شجرة BeautifulSoup حسب محرك التحليل"""
+    if backend == "strainer":
+        # تحليل صفوف المنشورات فقط وتجاهل باقي الصفحة
+        return BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("tr", class_=_POST_CLASS_RE))
+    if backend == "lxml":
+        try:
+            return BeautifulSoup(html, "lxml")
+        except FeatureNotFound:
+            logger.warning("⚠️ مكتبة lxml غير مثبتة - سيتم استخدام html.parser")
+    return BeautifulSoup(html, "html.parser")
+
+def extract_posts(html, backend=None, limit=10):
+    """استخراج بيانات المنشورات من الصفحة باستخدام محرك التحليل المحدد"""
+    backend = backend or PARSER_BACKEND
+    # إصابات ذاكرة التصنيف لا تفحص جدول الفئات، فيُفحص هنا مرة لكل صفحة
+    refresh_categories()
+    
+    with PARSE_SECONDS.time(backend=backend), profiler.span(f"parse:{backend}"):
+        if backend == "stream":
+            rows = extract_post_rows(html, limit)
+            posts = [build_post(**row) for row in rows]
+        else:
+            soup = _make_soup(html, backend)
+            posts = [extract_post_data(post) for post in soup.select("tr.forum_post")[:limit]]
+    
+    extracted = [post for post in posts if post]
+    POSTS_EXTRACTED.inc(len(extracted))
+    if len(extracted) < len(posts):
+        POST_EXTRACT_FAILURES.inc(len(posts) - len(extracted))
+    return extracted
+
+def parse_posts(html, backend=None):
+    """تحليل صفحة الطلبات واستخراج المنشورات"""
+    recent_posts = []
+    now = datetime.now(timezone.utc)
+    # كل صفوف الصفحة حتى لا يفوت شيء في أوقات الذروة (العرض يأخذ أول 10 فقط)
+    all_posts = extract_posts(html, backend, limit=None)
+
+    for post_data in all_posts:
+        # فحص إذا كان حديث
+        if is_recent(post_data.posted_at, now):
+            recent_posts.append(post_data)
+            logger.info(f"✅ منشور حديث: {post_data.title[:30]}...")
+
+    logger.info(f"✅ {len(recent_posts)} منشور حديث من أصل {len(all_posts)}")
+    return recent_posts, all_posts
+
 def extract_post_data(post):
     """استخراج بيانات المنشور"""
+    title_tag = post.select_one("h3.details-head a")
+    if not title_tag:
+        return None
+    
+    username = post.select_one("a.user")
+    
+    # استخراج الوقت
+    time_element = post.select_one("li.d-lg-inline-block span[dir='ltr']")
+    if time_element:
+        time_text = time_element.get_text(strip=True)
+        timestamp = time_element.get('title', '')
+    else:
+        time_text = None
+        timestamp = ""
+    
+    return build_post(
+        id=post.get("id", ""),
+        title=title_tag.get_text(strip=True),
+        href=title_tag.get('href'),
+        username=username.get_text(strip=True) if username else None,
+        time_text=time_text,
+        timestamp=timestamp
+    )
+
+def build_post(id, title=None, href=None, username=None, time_text=None, timestamp=""):
+    """بناء كائن Post من الحقول المستخرجة (مشترك بين كل محركات التحليل)"""
+    if title is None:
+        return None
+    
     try:
-        title_tag = post.select_one("h3.details-head a")
-        if not title_tag:
-            return None
-            
-        title = title_tag.get_text(strip=True)
-        link = f"https://khamsat.com{title_tag['href']}"
+        if href is None:
+            raise KeyError('href')
         
-        username = post.select_one("a.user")
-        username = username.get_text(strip=True) if username else "غير معروف"
-        
-        # استخراج الوقت
-        time_element = post.select_one("li.d-lg-inline-block span[dir='ltr']")
-        if time_element:
-            time_text = time_element.get_text(strip=True)
-            timestamp = time_element.get('title', '')
-        else:
+        link = f"{KHAMSAT_BASE_URL}{href}"
+        if username is None:
+            username = "غير معروف"
+        if time_text is None:
             time_text = "منذ دقائق قليلة"
             timestamp = ""
         
-        categories = classify_post(title)
-        primary_category = categories[0] if categories else "أخرى"
-        primary_icon = CATEGORIES[primary_category]["icon"]
-        
-        return {
-            "id": post.get("id", ""),
-            "title": title,
-            "link": link,
-            "username": username,
-            "time_text": time_text,
-            "timestamp": timestamp,
-            "categories": categories,
-            "primary_category": primary_category,
-            "primary_icon": primary_icon
-        }
+        return Post(
+            id=id,
+            title=title,
+            link=link,
+            username=username,
+            time_text=time_text,
+            timestamp=timestamp,
+            posted_at=parse_timestamp(timestamp, id),
+            category_mask=classify_post_mask(title, id)
+        )
     except Exception as e:
         logger.error(f"خطأ في استخراج بيانات المنشور: {e}")
         return None
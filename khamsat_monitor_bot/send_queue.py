@@ -0,0 +1,247 @@
+import asyncio
+import html
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime
+from telegram.error import (
+    BadRequest, ChatMigrated, Forbidden, InvalidToken, NetworkError, RetryAfter, TelegramError
+)
+from atomic_io import atomic_write_json
+from config import (
+    logger, SEND_GLOBAL_RATE, SEND_PER_CHAT_RATE, SEND_WORKERS,
+    SEND_MAX_RETRIES, SEND_BACKOFF_BASE, SEND_BACKOFF_MAX, DEAD_LETTER_FILE
+)
+from metrics import registry, SEND_SECONDS, SEND_RESULTS
+from profiler import profiler
+
+class TokenBucket:
+    """دلو رموز بسيط: rate رمز في الثانية بسعة capacity"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """حجز رمز وإرجاع زمن الانتظار اللازم قبل استخدامه (بالثواني)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds):
+        """تفريغ الدلو وإيقاف امتلائه لمدة seconds (بعد RetryAfter لا يُرسل دفعة كاملة فور الاستئناف)"""
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    def is_idle(self):
+        """الدلو ممتلئ ولا يحتاج للاحتفاظ به"""
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+def _plain_text(text, parse_mode):
+    """نسخة نصية بدون تنسيق من رسالة HTML"""
+    if str(parse_mode).upper() == "HTML":
+        return html.unescape(_HTML_TAG_RE.sub("", text))
+    return text
+
+class _Job:
+    """رسالة في طابور الإرسال"""
+
+    def __init__(self, chat_id, text, kwargs, future, span=None):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.future = future
+        self.span = span  # مرحلة التتبع التي أضافت الرسالة (وضع التحليل فقط)
+        self.attempts = 0
+
+class MessageQueue:
+    """طابور إرسال غير متزامن يحترم حدود تليجرام العامة ولكل محادثة"""
+
+    def __init__(self, global_rate=SEND_GLOBAL_RATE, per_chat_rate=SEND_PER_CHAT_RATE,
+                 workers=SEND_WORKERS, max_retries=SEND_MAX_RETRIES,
+                 dead_letter_file=DEAD_LETTER_FILE):
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.workers = workers
+        self.max_retries = max_retries
+        self.dead_letter_file = dead_letter_file
+        self._chat_buckets = {}
+        self._queue = None
+        self._tasks = []
+        self._bot = None
+        self._paused_until = 0.0  # إيقاف مؤقت لكل العمال بعد RetryAfter (time.monotonic)
+        self._dead_letters = None  # نسخة في الذاكرة من ملف الرسائل الميتة (تُحمّل عند أول حاجة)
+        self._dead_letter_lock = asyncio.Lock()
+        self.stats = {"sent": 0, "retried": 0, "rate_limited": 0, "paused": 0, "dead_lettered": 0}
+
+    def start(self, bot):
+        """تشغيل عمال الإرسال"""
+        self._bot = bot
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"📮 تم تشغيل طابور الإرسال ({self.workers} عمال)")
+
+    async def stop(self):
+        """إيقاف العمال"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, chat_id, text, **kwargs):
+        """إضافة رسالة للطابور - تعيد Future تصبح True عند التسليم أو False عند نقلها للرسائل الميتة"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Job(chat_id, text, kwargs, future, profiler.current_span()))
+        return future
+
+    def pending(self):
+        """عدد الرسائل المنتظرة"""
+        return self._queue.qsize() if self._queue else 0
+
+    def _chat_bucket(self, chat_id):
+        """دلو المحادثة (مع حذف الدلاء الخاملة لتحديد الذاكرة)"""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 10000:
+                self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.is_idle()}
+            bucket = TokenBucket(self.per_chat_rate, 1)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _worker(self):
+        """عامل إرسال واحد"""
+        while True:
+            job = await self._queue.get()
+            try:
+                delay = max(self.global_bucket.reserve(), self._chat_bucket(job.chat_id).reserve())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self._wait_pause()
+                await self._send(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ خطأ غير متوقع في طابور الإرسال: {e}")
+                await self._dead_letter(job, e)
+            finally:
+                self._queue.task_done()
+
+    async def _wait_pause(self):
+        """انتظار انتهاء الإيقاف العام (قد يُمدد أثناء الانتظار بـ RetryAfter آخر)"""
+        while (remaining := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+
+    def _pause(self, delay):
+        """إيقاف الإرسال لكل المحادثات لمدة delay ثانية"""
+        until = time.monotonic() + delay
+        if until <= self._paused_until:
+            return
+        self._paused_until = until
+        self.stats["paused"] += 1
+        self.global_bucket.pause(delay)
+
+    async def _send(self, job):
+        """محاولة إرسال واحدة مع تحديد مصير الرسالة عند الفشل"""
+        job.attempts += 1
+        try:
+            with SEND_SECONDS.time(), profiler.span_in(job.span, "telegram.send"):
+                await self._bot.send_message(chat_id=job.chat_id, text=job.text, **job.kwargs)
+        except RetryAfter as e:
+            # تجاوز حد تليجرام: الانتظار المطلوب بالضبط دون احتسابها كمحاولة فاشلة
+            self.stats["rate_limited"] += 1
+            SEND_RESULTS.inc(result="rate_limited")
+            job.attempts -= 1
+            retry_after = e.retry_after
+            delay = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+            logger.warning(f"⏳ تجاوز حد الإرسال - إيقاف الإرسال لكل المحادثات لمدة {delay} ثانية")
+            self._pause(delay)
+            self._retry_later(job, delay)
+            return
+        except ChatMigrated as e:
+            SEND_RESULTS.inc(result="migrated")
+            job.chat_id = e.new_chat_id
+            self._retry_later(job, 0)
+            return
+        except BadRequest as e:
+            if "can't parse entities" in str(e).lower() and job.kwargs.get("parse_mode"):
+                # تنسيق معطوب: إرسال نفس المحتوى كنص عادي بدل فقدان الرسالة
+                logger.warning(f"⚠️ تعذر تحليل تنسيق الرسالة للمحادثة {job.chat_id} - إعادة الإرسال كنص عادي")
+                SEND_RESULTS.inc(result="format_error")
+                job.text = _plain_text(job.text, job.kwargs.pop("parse_mode"))
+                self._retry_later(job, 0)
+                return
+            logger.error(f"❌ فشل إرسال دائم للمحادثة {job.chat_id}: {e}")
+            await self._dead_letter(job, e)
+            return
+        except (Forbidden, InvalidToken) as e:
+            # أخطاء دائمة: لا فائدة من إعادة المحاولة
+            logger.error(f"❌ فشل إرسال دائم للمحادثة {job.chat_id}: {e}")
+            await self._dead_letter(job, e)
+            return
+        except (NetworkError, TelegramError) as e:
+            if job.attempts > self.max_retries:
+                logger.error(f"❌ فشل الإرسال للمحادثة {job.chat_id} بعد {job.attempts} محاولات: {e}")
+                await self._dead_letter(job, e)
+                return
+            delay = min(SEND_BACKOFF_MAX, SEND_BACKOFF_BASE * 2 ** (job.attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+            self.stats["retried"] += 1
+            SEND_RESULTS.inc(result="retried")
+            logger.warning(f"⚠️ خطأ شبكة مؤقت أثناء الإرسال للمحادثة {job.chat_id} - إعادة المحاولة بعد {delay:.1f} ثانية")
+            self._retry_later(job, delay)
+            return
+
+        self.stats["sent"] += 1
+        SEND_RESULTS.inc(result="sent")
+        if not job.future.done():
+            job.future.set_result(True)
+
+    def _retry_later(self, job, delay):
+        """إعادة الرسالة للطابور بعد مهلة دون حجز عامل"""
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job)
+
+    async def _dead_letter(self, job, error):
+        """نقل الرسالة لقائمة الرسائل الميتة المحفوظة"""
+        self.stats["dead_lettered"] += 1
+        SEND_RESULTS.inc(result="dead_lettered")
+        if not job.future.done():
+            job.future.set_result(False)
+
+        async with self._dead_letter_lock:
+            if self._dead_letters is None:
+                self._dead_letters = await asyncio.to_thread(self.load_dead_letters)
+            self._dead_letters.append({
+                "chat_id": job.chat_id,
+                "text": job.text,
+                "error": str(error),
+                "attempts": job.attempts,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            })
+            del self._dead_letters[:-500]
+            try:
+                # كتابة ذرية خارج حلقة الأحداث - القفل يمنع تداخل الكتابات وترتيبها الخاطئ
+                await asyncio.to_thread(atomic_write_json, self.dead_letter_file, list(self._dead_letters))
+            except Exception as e:
+                logger.error(f"❌ خطأ في حفظ الرسائل الميتة: {e}")
+
+    def load_dead_letters(self):
+        """تحميل قائمة الرسائل الميتة"""
+        try:
+            if os.path.exists(self.dead_letter_file):
+                with open(self.dead_letter_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"❌ خطأ في تحميل الرسائل الميتة: {e}")
+        return []
+
+# إنشاء مثيل مشترك
+send_queue = MessageQueue()
+registry.gauge("khamsat_send_queue_depth", "Messages waiting in the send queue", callback=send_queue.pending)
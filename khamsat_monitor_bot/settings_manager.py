@@ -1,23 +1,35 @@
-import json
-import os
-from config import logger
+import asyncio
+import atexit
+from config import logger, SETTINGS_FLUSH_INTERVAL, DEDUP_LOG_FILE
+from storage import create_store
+from dedup_store import DedupStore
+from metrics import registry
+from profiler import profiler
 
 class SettingsManager:
-    def __init__(self, settings_file="bot_settings.json"):
+    def __init__(self, settings_file="bot_settings.json", store=None):
         self.settings_file = settings_file
+        self.store = store or create_store(settings_file)
         self.default_settings = {
             "monitoring_active": False,
             "last_sent_ids": [],
+            "last_seen_post": None,  # رقم أحدث منشور تمت معالجته (مؤشر اللحاق)
+            "muted_users": [],  # مستخدمون أوقفوا تنبيهاتهم الشخصية
             "user_categories": {}  # {user_id: [selected_categories]}
         }
         self.settings = self.load_settings()
+        self.store.attach(self.settings)
+        self.sent_ids = self._load_sent_ids()
+        self.muted_users = set(self.settings.get("muted_users", []))
+        self._categories_listeners = []
+        # حفظ أي تغييرات معلقة عند إغلاق البرنامج
+        atexit.register(self.flush)
     
     def load_settings(self):
-        """تحميل الإعدادات من الملف"""
+        """تحميل الإعدادات من المخزن"""
         try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+            settings = self.store.load("settings")
+            if settings is not None:
                 logger.info(f"✅ تم تحميل الإعدادات: مراقبة={'مفعلة' if settings.get('monitoring_active') else 'معطلة'}")
                 return settings
             else:
@@ -27,44 +39,98 @@ class SettingsManager:
             logger.error(f"❌ خطأ في تحميل الإعدادات: {e}")
             return self.default_settings.copy()
     
+    def _load_sent_ids(self):
+        """بناء ذاكرة المنشورات المرسلة من السجل (إن وجد) أو من المخزن"""
+        sent_ids = DedupStore(log_path=DEDUP_LOG_FILE)
+        if not sent_ids.load_log():
+            sent_ids.restore(self.store.load_sent_ids())
+        logger.info(f"🧾 تم استعادة {len(sent_ids)} معرف منشور مرسل")
+        return sent_ids
+    
     def save_settings(self):
-        """حفظ الإعدادات في الملف"""
-        try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=2)
-            logger.debug("💾 تم حفظ الإعدادات")
-        except Exception as e:
-            logger.error(f"❌ خطأ في حفظ الإعدادات: {e}")
+        """حفظ كل التغييرات المعلقة فوراً"""
+        self.flush()
+    
+    def flush(self):
+        """كتابة التغييرات المتراكمة في المخزن (كتابة مؤجلة وذرية في JSON)"""
+        with profiler.span("settings.flush"):
+            self.store.flush()
+    
+    async def flush_loop(self, interval=SETTINGS_FLUSH_INTERVAL):
+        """حفظ التغييرات المتراكمة دورياً"""
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
     
     def set_monitoring_active(self, active):
-        """تعديل حالة المراقبة"""
+        """تعديل حالة المراقبة (الاستئناف بعد الإيقاف يبدأ من المنشورات الحديثة دون لحاق)"""
+        if active and not self.is_monitoring_active():
+            self.set_last_seen_post(None)
         self.settings["monitoring_active"] = active
-        self.save_settings()
+        self.store.set_setting("monitoring_active", active)
+        self.flush()
         logger.info(f"🔄 تم تعديل حالة المراقبة: {'مفعلة' if active else 'معطلة'}")
     
     def is_monitoring_active(self):
         """فحص حالة المراقبة"""
         return self.settings.get("monitoring_active", False)
     
+    def set_user_alerts(self, user_id, enabled):
+        """تفعيل أو إيقاف التنبيهات التلقائية لمستخدم واحد"""
+        if enabled == (user_id not in self.muted_users):
+            return
+        if enabled:
+            self.muted_users.discard(user_id)
+        else:
+            self.muted_users.add(user_id)
+        self.settings["muted_users"] = sorted(self.muted_users)
+        self.store.set_setting("muted_users", self.settings["muted_users"])
+        logger.info(f"🔔 تنبيهات المستخدم {user_id}: {'مفعلة' if enabled else 'متوقفة'}")
+    
+    def is_user_alerts_enabled(self, user_id):
+        """هل تصل التنبيهات التلقائية لهذا المستخدم"""
+        return user_id not in self.muted_users
+    
     def add_sent_id(self, post_id):
         """إضافة معرف منشور مرسل"""
-        if post_id not in self.settings["last_sent_ids"]:
-            self.settings["last_sent_ids"].append(post_id)
-            # الاحتفاظ بآخر 100 معرف فقط لتوفير المساحة
-            if len(self.settings["last_sent_ids"]) > 100:
-                self.settings["last_sent_ids"] = self.settings["last_sent_ids"][-100:]
-            self.save_settings()
+        self.add_sent_ids([post_id])
+    
+    def add_sent_ids(self, post_ids):
+        """إضافة عدة معرفات منشورات مرسلة دفعة واحدة"""
+        with profiler.span("settings.sent_ids"):
+            added = self.sent_ids.add_many(post_ids)
+            if added:
+                self.settings["last_sent_ids"] = self.sent_ids.ids()
+                self.store.add_sent_ids(added, keep=self.sent_ids.capacity, max_age=self.sent_ids.ttl)
     
     def get_sent_ids(self):
-        """الحصول على معرفات المنشورات المرسلة"""
-        return set(self.settings.get("last_sent_ids", []))
+        """ذاكرة المنشورات المرسلة المشتركة (تدعم in و len)"""
+        return self.sent_ids
+    
+    def get_dedup_stats(self):
+        """إحصائيات منع التكرار (إصابات، حذف، وإرسال مكرر مشتبه بعد إعادة التشغيل)"""
+        return {**self.sent_ids.stats, "size": len(self.sent_ids)}
     
     def clear_sent_ids(self):
         """مسح معرفات المنشورات المرسلة"""
+        self.sent_ids.clear()
         self.settings["last_sent_ids"] = []
-        self.save_settings()
+        self.store.clear_sent_ids()
+        self.flush()
         logger.info("🗑️ تم مسح معرفات المنشورات المرسلة")
     
+    def get_last_seen_post(self):
+        """رقم أحدث منشور تمت معالجته - None قبل أول فحص"""
+        return self.settings.get("last_seen_post")
+    
+    def set_last_seen_post(self, number):
+        """تقديم مؤشر آخر منشور تمت معالجته"""
+        if number == self.settings.get("last_seen_post"):
+            return
+        self.settings["last_seen_post"] = number
+        with profiler.span("settings.cursor"):
+            self.store.set_setting("last_seen_post", number)
+    
     def set_selected_categories(self, categories, user_id=None):
         """تحديد الفئات المختارة لمستخدم محدد"""
         if user_id is None:
@@ -76,7 +142,10 @@ class SettingsManager:
             self.settings["user_categories"] = {}
         
         self.settings["user_categories"][user_id_str] = categories
-        self.save_settings()
+        self.store.set_user_categories(user_id, categories)
+        
+        for listener in self._categories_listeners:
+            listener(user_id, categories)
         
         if categories and "__none__" not in categories:
             logger.info(f"🏷️ تم تحديد الفئات للمستخدم {user_id}: {', '.join(categories)}")
@@ -85,6 +154,10 @@ class SettingsManager:
         else:
             logger.info(f"🏷️ تم تحديد جميع الفئات للمستخدم {user_id}")
     
+    def add_categories_listener(self, listener):
+        """تسجيل دالة تُستدعى (user_id, categories) عند تغيير فئات أي مستخدم"""
+        self._categories_listeners.append(listener)
+    
     def get_selected_categories(self, user_id=None):
         """الحصول على الفئات المختارة لمستخدم محدد"""
         if user_id is None:
@@ -104,3 +177,7 @@ class SettingsManager:
 
 # إنشاء مثيل مشترك للاستخدام في باقي الملفات
 settings_manager = SettingsManager()
+registry.gauge("khamsat_dedup_size", "Post ids held by the dedup store",
+               callback=lambda: len(settings_manager.sent_ids))
+registry.gauge("khamsat_dedup_suspected_resends", "Ids older than the restored maximum that were sent again",
+               callback=lambda: settings_manager.sent_ids.stats["suspected_resends"])
@@ -0,0 +1,277 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import logger, STORAGE_BACKEND, SQLITE_DB_FILE
+from atomic_io import atomic_write_json
+
+class JsonStore:
+    """تخزين مستند كامل في ملف JSON مع كتابة مؤجلة وذرية
+
+    عمليات التعديل تسجل فقط وجود تغييرات، والكتابة الفعلية تتم عند flush.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.document = None
+        self._dirty = False
+
+    def load(self, kind):
+        """تحميل المستند من الملف - None إذا لم يكن موجوداً"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def attach(self, document):
+        """ربط المستند الموجود في الذاكرة ليُكتب عند الحفظ"""
+        self.document = document
+
+    def mark_dirty(self):
+        """تسجيل وجود تغييرات غير محفوظة"""
+        self._dirty = True
+
+    # في JSON كل تعديل يعني إعادة كتابة المستند كاملاً لاحقاً
+    def set_setting(self, key, value):
+        self.mark_dirty()
+
+    def set_user_categories(self, user_id, categories):
+        self.mark_dirty()
+
+    def add_sent_ids(self, post_ids, keep, max_age=None):
+        self.mark_dirty()
+
+    def load_sent_ids(self):
+        """المعرفات المرسلة [(post_id, None)] - JSON لا يحفظ وقت الإرسال"""
+        return [(post_id, None) for post_id in (self.document or {}).get("last_sent_ids", [])]
+
+    def clear_sent_ids(self):
+        self.mark_dirty()
+
+    def set_user_status(self, user_id, status, info=None):
+        self.mark_dirty()
+
+    def flush(self):
+        """كتابة المستند إذا تغير"""
+        if not self._dirty or self.document is None:
+            return
+        try:
+            self._dirty = False
+            atomic_write_json(self.path, self.document)
+            logger.debug(f"💾 تم حفظ {self.path}")
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"❌ خطأ في حفظ {self.path}: {e}")
+
+class SQLiteStore:
+    """تخزين المستخدمين والإعدادات والمنشورات المرسلة في SQLite (وضع WAL)
+
+    كل تعديل يكتب الصفوف المتأثرة فقط بدل إعادة كتابة مستند كامل.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,
+            username TEXT,
+            first_name TEXT,
+            requested_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_users_status ON users(status);
+        CREATE TABLE IF NOT EXISTS user_categories (
+            user_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            PRIMARY KEY (user_id, category)
+        );
+        CREATE INDEX IF NOT EXISTS idx_user_categories_category ON user_categories(category);
+        CREATE TABLE IF NOT EXISTS sent_posts (
+            post_id TEXT PRIMARY KEY,
+            sent_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sent_posts_sent_at ON sent_posts(sent_at);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def _write(self, sql, params=()):
+        """تنفيذ عملية كتابة داخل معاملة"""
+        with self._lock, self.conn:
+            self.conn.execute(sql, params)
+
+    TABLES = {
+        "settings": ("settings", "user_categories", "sent_posts"),
+        "users": ("users",)
+    }
+
+    # مفاتيح الإعدادات المحفوظة في جداولها الخاصة بدل جدول settings
+    TABLE_SETTINGS = ("last_sent_ids", "user_categories")
+
+    def is_empty(self, kind=None):
+        """فحص إذا كانت جداول نوع معين (أو كل الجداول) بلا بيانات"""
+        kinds = [kind] if kind else list(self.TABLES)
+        for table in (table for k in kinds for table in self.TABLES[k]):
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return False
+        return True
+
+    def load(self, kind):
+        """بناء مستند بنفس شكل ملفات JSON - None إذا لم توجد بيانات"""
+        if self.is_empty(kind):
+            return None
+        return self._load_users() if kind == "users" else self._load_settings()
+
+    def _load_settings(self):
+        settings = {"monitoring_active": False, "last_sent_ids": [], "user_categories": {}}
+        for key, value in self.conn.execute("SELECT key, value FROM settings"):
+            settings[key] = json.loads(value)
+
+        settings["last_sent_ids"] = [
+            row[0] for row in self.conn.execute("SELECT post_id FROM sent_posts ORDER BY sent_at, rowid")
+        ]
+
+        user_categories = settings["user_categories"]
+        rows = self.conn.execute("SELECT user_id, category FROM user_categories ORDER BY user_id, position")
+        for user_id, category in rows:
+            user_categories.setdefault(str(user_id), []).append(category)
+        return settings
+
+    def _load_users(self):
+        users = {"approved_users": [], "pending_users": {}, "rejected_users": []}
+        rows = self.conn.execute(
+            "SELECT user_id, status, username, first_name, requested_at FROM users ORDER BY rowid"
+        )
+        for user_id, status, username, first_name, requested_at in rows:
+            if status == "pending":
+                users["pending_users"][str(user_id)] = {
+                    "username": username,
+                    "first_name": first_name,
+                    "timestamp": requested_at
+                }
+            elif status in ("approved", "rejected"):
+                users[f"{status}_users"].append(user_id)
+        return users
+
+    def attach(self, document):
+        pass
+
+    def set_setting(self, key, value):
+        self._write(
+            "INSERT INTO settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value, ensure_ascii=False))
+        )
+
+    def set_user_categories(self, user_id, categories):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM user_categories WHERE user_id = ?", (int(user_id),))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO user_categories (user_id, position, category) VALUES (?, ?, ?)",
+                [(int(user_id), position, category) for position, category in enumerate(categories)]
+            )
+
+    def add_sent_ids(self, post_ids, keep, max_age=None):
+        """إضافة معرفات مرسلة مع الاحتفاظ بأحدث keep معرف عمرها أقل من max_age فقط"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO sent_posts (post_id, sent_at) VALUES (?, ?)",
+                [(post_id, now) for post_id in post_ids]
+            )
+            if max_age:
+                self.conn.execute("DELETE FROM sent_posts WHERE sent_at < ?", (now - max_age,))
+            if keep is not None:
+                self.conn.execute(
+                    "DELETE FROM sent_posts WHERE rowid NOT IN "
+                    "(SELECT rowid FROM sent_posts ORDER BY sent_at DESC, rowid DESC LIMIT ?)",
+                    (keep,)
+                )
+
+    def load_sent_ids(self):
+        """المعرفات المرسلة مع وقت إرسالها من الأقدم للأحدث"""
+        return self.conn.execute("SELECT post_id, sent_at FROM sent_posts ORDER BY sent_at, rowid").fetchall()
+
+    def clear_sent_ids(self):
+        self._write("DELETE FROM sent_posts")
+
+    def set_user_status(self, user_id, status, info=None):
+        """تحديث حالة مستخدم (approved/pending/rejected) - None للحذف"""
+        if status is None:
+            self._write("DELETE FROM users WHERE user_id = ?", (int(user_id),))
+            return
+        info = info or {}
+        self._write(
+            "INSERT INTO users (user_id, status, username, first_name, requested_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET status = excluded.status, "
+            "username = COALESCE(excluded.username, users.username), "
+            "first_name = COALESCE(excluded.first_name, users.first_name), "
+            "requested_at = COALESCE(excluded.requested_at, users.requested_at)",
+            (int(user_id), status, info.get("username"), info.get("first_name"), info.get("timestamp"))
+        )
+
+    def import_documents(self, settings=None, users=None):
+        """استيراد مستندات JSON كاملة في معاملة واحدة"""
+        with self._lock, self.conn:
+            if settings:
+                # كل المفاتيح البسيطة (حالة الرصد، المكتومون، مؤشر اللحاق...) - الجداول الخاصة أدناه
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                    [
+                        (key, json.dumps(value, ensure_ascii=False))
+                        for key, value in settings.items() if key not in self.TABLE_SETTINGS
+                    ]
+                )
+                now = time.time()
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO sent_posts (post_id, sent_at) VALUES (?, ?)",
+                    [(post_id, now + i * 1e-6) for i, post_id in enumerate(settings.get("last_sent_ids", []))]
+                )
+                for user_id, categories in settings.get("user_categories", {}).items():
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO user_categories (user_id, position, category) VALUES (?, ?, ?)",
+                        [(int(user_id), position, category) for position, category in enumerate(categories)]
+                    )
+            if users:
+                # آخر إدراج يفوز: نفس أولوية UserManager عند التعارض (معتمد ثم مرفوض ثم انتظار)
+                rows = [
+                    (int(user_id), "pending", info.get("username"), info.get("first_name"), info.get("timestamp"))
+                    for user_id, info in users.get("pending_users", {}).items()
+                ]
+                rows += [(int(user_id), "rejected", None, None, None) for user_id in users.get("rejected_users", [])]
+                rows += [(int(user_id), "approved", None, None, None) for user_id in users.get("approved_users", [])]
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO users (user_id, status, username, first_name, requested_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+
+    def flush(self):
+        # كل عملية تُحفظ فوراً في معاملتها
+        pass
+
+_sqlite_store = None
+
+def create_store(json_path):
+    """إنشاء مخزن حسب STORAGE_BACKEND: ملف JSON مستقل أو قاعدة SQLite مشتركة"""
+    global _sqlite_store
+    if STORAGE_BACKEND != "sqlite":
+        return JsonStore(json_path)
+
+    if _sqlite_store is None:
+        _sqlite_store = SQLiteStore(SQLITE_DB_FILE)
+        if _sqlite_store.is_empty():
+            # أول تشغيل على SQLite: استيراد ملفات JSON الحالية مرة واحدة
+            from migration_helper import migrate_json_to_sqlite
+            migrate_json_to_sqlite(_sqlite_store)
+    return _sqlite_store
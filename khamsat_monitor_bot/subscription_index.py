@@ -0,0 +1,122 @@
+from itertools import compress
+from settings_manager import settings_manager
+from categories import category_mask, add_reload_listener
+from config import logger
+
+# تحويل أرقام قناع المواقع الثنائي ("0"/"1") إلى بايتات 0/1 لـ compress
+_POSITION_FLAGS = bytes.maketrans(b"01", b"\x00\x01")
+
+# بتات قناع الفئات منفصلة: {قناع: (بت، ...)} - تُحسب مرة لكل قناع
+_bits_by_mask = {}
+
+def _mask_bits(mask):
+    """بتات الفئات في القناع كأعداد منفصلة"""
+    bits = _bits_by_mask.get(mask)
+    if bits is None:
+        bits = []
+        remaining = mask
+        while remaining:
+            bit = remaining & -remaining
+            bits.append(bit)
+            remaining ^= bit
+        bits = _bits_by_mask[mask] = tuple(bits)
+    return bits
+
+class SubscriptionIndex:
+    """فهرس معكوس من الفئة (بتها في القناع) إلى المستخدمين المشتركين فيها لتوجيه التنبيهات
+
+    التوجيه يبحث في الفهرس مرة لكل فئة ظهرت في المنشورات، فتكلفته
+    O(المنشورات + المستخدمين × فئاتهم) مهما زاد عدد المنشورات. القناع صيغة التخزين فقط.
+    """
+
+    def __init__(self):
+        self.by_category = {}  # {category_bit: set(user_id)}
+        self.all_categories = set()  # اختاروا "كل الفئات" صراحةً
+        self.opted_out = set()  # ألغوا كل الفئات (__none__)
+        self._selections = {}  # {user_id: category_mask} للمستخدمين بفئات محددة
+
+    def load(self, user_categories):
+        """بناء الفهرس من إعدادات الفئات المحفوظة {user_id: [categories]}
+
+        يُبنى في هياكل جديدة ثم يُستبدل دفعة واحدة، لأن إعادة البناء بعد تغيير
+        جدول الفئات قد تحدث في خيط التحليل أثناء توجيه تنبيه.
+        """
+        index = SubscriptionIndex()
+        for user_id, categories in user_categories.items():
+            index.update(user_id, categories)
+        self.by_category, self.all_categories, self.opted_out, self._selections = (
+            index.by_category, index.all_categories, index.opted_out, index._selections
+        )
+        logger.debug(f"🗂️ تم بناء فهرس الاشتراكات: {len(self._selections)} مستخدم بفئات محددة")
+
+    def update(self, user_id, categories):
+        """تحديث اشتراكات مستخدم واحد فقط"""
+        user_id = int(user_id)
+        self._remove(user_id)
+        
+        if len(categories) == 0:
+            self.all_categories.add(user_id)
+        elif "__none__" in categories:
+            self.opted_out.add(user_id)
+        else:
+            mask = category_mask(categories)
+            self._selections[user_id] = mask
+            for bit in _mask_bits(mask):
+                self.by_category.setdefault(bit, set()).add(user_id)
+
+    def _remove(self, user_id):
+        """إزالة مستخدم من كل مواضع الفهرس"""
+        self.all_categories.discard(user_id)
+        self.opted_out.discard(user_id)
+        for bit in _mask_bits(self._selections.pop(user_id, 0)):
+            users = self.by_category.get(bit)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self.by_category[bit]
+
+    def route(self, posts, subscribers):
+        """توزيع المنشورات على المشتركين
+
+        تعيد قائمة (منشورات، [مستخدمين]) بحيث يشترك كل المستخدمين الذين
+        يستحقون نفس المنشورات في مجموعة واحدة (رسالة واحدة).
+        المستخدمون بدون إعدادات يُعاملون كمشتركين في كل الفئات.
+        """
+        subscribers = set(subscribers)
+        
+        # مواقع المنشورات في كل فئة كقناع بتات (مرور واحد على المنشورات)
+        positions_by_category = {}
+        for position, post in enumerate(posts):
+            position_bit = 1 << position
+            for bit in _mask_bits(post.category_mask):
+                positions_by_category[bit] = positions_by_category.get(bit, 0) | position_bit
+        
+        # بحث واحد في الفهرس لكل فئة ظهرت، ومنشورات كل مستخدم = اتحاد مواقع فئاته
+        matched = {}
+        for bit, positions in positions_by_category.items():
+            for user_id in self.by_category.get(bit, ()):
+                matched[user_id] = matched.get(user_id, 0) | positions
+        
+        groups = {}
+        for user_id, positions in matched.items():
+            if user_id in subscribers:
+                groups.setdefault(positions, []).append(user_id)
+        
+        everyone = subscribers.difference(self._selections, self.opted_out)
+        if everyone and posts:
+            groups.setdefault((1 << len(posts)) - 1, []).extend(everyone)
+        
+        return [
+            (list(compress(posts, f"{positions:b}"[::-1].encode().translate(_POSITION_FLAGS))), user_ids)
+            for positions, user_ids in groups.items()
+        ]
+
+def _rebuild():
+    """إعادة حساب أقنعة المشتركين من أسماء الفئات المحفوظة بعد تغيير ترتيب البتات"""
+    subscription_index.load(settings_manager.settings.get("user_categories", {}))
+
+# إنشاء مثيل مشترك يبقى متزامناً مع إعدادات الفئات وجدولها
+subscription_index = SubscriptionIndex()
+_rebuild()
+settings_manager.add_categories_listener(subscription_index.update)
+add_reload_listener(_rebuild)
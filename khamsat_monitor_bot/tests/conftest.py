@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# وحدات البوت مسطحة في المجلد الأب وتُستورد بأسمائها مباشرة
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config ينشئ ملف السجل في مجلد العمل عند الاستيراد - إبقاؤه خارج المستودع
+os.chdir(tempfile.mkdtemp(prefix="khamsat_tests_"))
@@ -0,0 +1,90 @@
+import copy
+
+import pytest
+
+import categories
+import formatter
+from categories import CATEGORIES, classify_post, classify_post_mask, category_names
+from benchmarks.fixtures import generate_posts, render_listing
+from scraper import extract_posts
+
+@pytest.fixture
+def restore_categories():
+    original = copy.deepcopy(CATEGORIES)
+    yield
+    categories.reload_categories(original)
+
+def test_editing_keywords_invalidates_cached_classification(restore_categories):
+    assert classify_post("مطلوب خبير نحل", "forum_post-1") == ["أخرى"]
+
+    CATEGORIES["أسلوب حياة"]["keywords"].append("نحل")
+
+    # إخفاق جديد يفحص الجدول ويُبطل النتائج القديمة
+    assert classify_post("عنوان آخر", "forum_post-2") == ["أخرى"]
+    assert classify_post("مطلوب خبير نحل", "forum_post-1") == ["أسلوب حياة"]
+
+def test_parse_refreshes_table_before_cache_hits(restore_categories):
+    post = generate_posts(1)[0]
+    post["title"] = "مطلوب خبير نحل"
+    html = render_listing([post])
+    post_id = f"forum_post-{post['id']}"
+    assert classify_post(post["title"], post_id) == ["أخرى"]
+
+    CATEGORIES["أسلوب حياة"]["keywords"].append("نحل")
+
+    for backend in ("stream", "html.parser"):
+        (parsed,) = extract_posts(html, backend, limit=None)
+        assert parsed.categories == ("أسلوب حياة",)
+
+def test_new_category_gets_a_bit_and_icon(restore_categories):
+    CATEGORIES["نحل"] = {"icon": "🐝", "keywords": ["نحل"]}
+
+    mask = classify_post_mask("تربية نحل", "forum_post-3")
+    assert category_names(mask) == ("نحل",)
+    assert formatter._category_header(("نحل",))[0].startswith("🐝")
+
+def test_reordering_categories_keeps_alert_routing(restore_categories, monkeypatch):
+    import scraper
+    import subscription_index as index_module
+    from benchmarks.hot_path import random_selections
+    from settings_manager import settings_manager
+
+    selections = random_selections(200, list(categories.CATEGORY_NAMES), seed=3)
+    monkeypatch.setitem(settings_manager.settings, "user_categories",
+                        {str(user_id): names for user_id, names in selections.items()})
+    index_module._rebuild()
+    monkeypatch.setitem(scraper._page_states, "page", {"digest": "d", "result": ([], [])})
+
+    html = render_listing(generate_posts(60))
+    subscribers = set(range(1, 260))
+
+    def recipients():
+        """{معرف المنشور: المستخدمون} حسب الفهرس، ومتوقعاً من أسماء فئات المنشور"""
+        posts = extract_posts(html, limit=None)
+        routed = {post.id: set() for post in posts}
+        for group, user_ids in index_module.subscription_index.route(posts, subscribers):
+            for post in group:
+                routed[post.id].update(user_ids)
+        expected = {
+            post.id: {
+                user_id for user_id in subscribers
+                if not selections.get(user_id) or set(selections[user_id]) & set(post.categories)
+            } - {user_id for user_id, names in selections.items() if "__none__" in names}
+            for post in posts
+        }
+        return routed, expected
+
+    routed, expected = recipients()
+    assert routed == expected
+    design_bit = categories.category_mask(["تصميم"])
+
+    # ترتيب معكوس: تتغير بتات كل الفئات (والفئات الثلاث الأولى للمنشورات متعددة الفئات)
+    items = list(CATEGORIES.items())
+    CATEGORIES.clear()
+    CATEGORIES.update(reversed(items))
+
+    routed, expected = recipients()
+    assert categories.category_mask(["تصميم"]) != design_bit
+    assert routed == expected
+    # نتائج الصفوف المحفوظة بأقنعة الترتيب القديم أُسقطت
+    assert scraper._page_states["page"] == {}
@@ -0,0 +1,38 @@
+import time
+
+from dedup_store import DedupStore
+
+def test_expired_ids_are_evicted():
+    store = DedupStore(capacity=100, ttl=60)
+    now = time.time()
+    store.add_many(["forum_post-1", "forum_post-2"], added_at=now - 120)
+    store.add("forum_post-3", added_at=now)
+
+    assert "forum_post-3" in store
+    assert "forum_post-1" not in store
+    assert store.ids() == ["forum_post-3"]
+    assert store.stats["evicted_ttl"] == 2
+
+def test_oldest_ids_are_evicted_past_capacity():
+    store = DedupStore(capacity=3, ttl=None)
+    added = store.add_many([f"forum_post-{n}" for n in range(1, 6)])
+
+    assert added == [f"forum_post-{n}" for n in range(1, 6)]
+    assert store.ids() == ["forum_post-3", "forum_post-4", "forum_post-5"]
+    assert store.stats["evicted_capacity"] == 2
+    # معرف موجود لا يُضاف مرة أخرى ولا يغير الترتيب
+    assert store.add_many(["forum_post-4"]) == []
+    assert store.ids() == ["forum_post-3", "forum_post-4", "forum_post-5"]
+
+def test_log_restores_ids_with_their_age(tmp_path):
+    log_path = str(tmp_path / "sent_ids.log")
+    now = time.time()
+    store = DedupStore(capacity=10, ttl=60, log_path=log_path)
+    store.add("forum_post-1", added_at=now - 30)
+    store.add("forum_post-2", added_at=now)
+
+    restored = DedupStore(capacity=10, ttl=20, log_path=log_path)
+    assert restored.load_log()
+    # العمر محفوظ في السجل: المعرف الأقدم من ttl الجديد لا يعود
+    assert restored.ids() == ["forum_post-2"]
+    assert restored.stats["restored"] == 1
@@ -0,0 +1,95 @@
+import pytest
+
+from categories import classify_post_mask
+from formatter import ALERT, LIST, chunk_posts, format_new_posts_alert, format_post, utf16_length
+from post import Post
+
+LIMIT = 4096
+
+# عنوان عربي طويل مع رموز خارج BMP (كل رمز تعبيري وحدتان في UTF-16)
+LONG_TITLE = "مطلوب مصمم محترف لتصميم هوية بصرية كاملة لمتجر إلكتروني 🎨🛒 " * 6
+
+def make_post(number, title):
+    post_id = f"forum_post-{number}"
+    return Post(
+        id=post_id,
+        title=title,
+        link=f"https://khamsat.com/community/requests/{number}",
+        username="أحمد م.",
+        time_text="منذ دقيقة",
+        timestamp="",
+        posted_at=None,
+        category_mask=classify_post_mask(title, post_id),
+    )
+
+def posts_of(chunks):
+    return [post for _, message_posts in chunks for post in message_posts]
+
+@pytest.mark.parametrize("kind", [LIST, ALERT])
+def test_messages_fit_telegram_limit(kind):
+    posts = [make_post(1000 + i, f"{i} {LONG_TITLE}") for i in range(60)]
+    chunks = chunk_posts(posts, kind)
+
+    assert len(chunks) > 1
+    for text, _ in chunks:
+        assert utf16_length(text) <= LIMIT
+
+def test_utf16_length_counts_surrogate_pairs():
+    assert utf16_length("مرحبا") == 5
+    assert utf16_length("🎨") == 2
+
+def test_list_order_is_preserved():
+    posts = [make_post(1000 + i, f"{i} {LONG_TITLE}") for i in range(40)]
+    assert posts_of(chunk_posts(posts, LIST)) == posts
+
+def test_alert_is_oldest_first():
+    posts = [make_post(2000 - i, f"{i} {LONG_TITLE}") for i in range(40)]
+    chunks = format_new_posts_alert(posts)
+    assert posts_of(chunks) == list(reversed(posts))
+
+def test_list_numbering_continues_across_messages():
+    posts = [make_post(1000 + i, f"{i} {LONG_TITLE}") for i in range(40)]
+    chunks = chunk_posts(posts, LIST)
+    index = 1
+    for text, message_posts in chunks:
+        for post in message_posts:
+            assert format_post(post, index) in text
+            index += 1
+
+@pytest.mark.parametrize("kind", [LIST, ALERT])
+def test_posts_are_never_split_between_messages(kind):
+    posts = [make_post(1000 + i, f"{i} {LONG_TITLE}") for i in range(60)]
+    chunks = chunk_posts(posts, kind, show_index=False)
+
+    for post in posts:
+        holders = [text for text, _ in chunks if post.link in text]
+        assert len(holders) == 1
+        assert format_post(post) in holders[0]
+
+def test_single_overlong_title_is_truncated_to_fit():
+    title = "تصميم شعار وهوية بصرية متكاملة " * 400
+    post = make_post(4242, title)
+    assert utf16_length(format_post(post)) > LIMIT
+
+    chunks = chunk_posts([post], LIST)
+
+    assert len(chunks) == 1
+    text, message_posts = chunks[0]
+    assert message_posts == [post]
+    assert utf16_length(text) <= LIMIT
+    assert "…</a>" in text
+    assert f'<a href="{post.link}">' in text
+
+def test_overlong_title_among_normal_posts_keeps_order():
+    posts = [make_post(1, "طلب قصير"), make_post(2, "عنوان طويل جداً " * 600), make_post(3, "طلب آخر")]
+    chunks = chunk_posts(posts, LIST)
+
+    assert posts_of(chunks) == posts
+    for text, _ in chunks:
+        assert utf16_length(text) <= LIMIT
+
+def test_no_limit_renders_one_message():
+    posts = [make_post(1000 + i, LONG_TITLE) for i in range(60)]
+    chunks = chunk_posts(posts, LIST, limit=None)
+    assert len(chunks) == 1
+    assert posts_of(chunks) == posts
@@ -0,0 +1,123 @@
+import random
+import re
+from html import unescape
+from html.parser import HTMLParser
+
+import pytest
+
+from categories import classify_post_mask
+from formatter import ALERT, LIST, chunk_posts, escape_html, utf16_length
+from post import Post
+
+LIMIT = 4096
+
+# عناوين يصعب تنسيقها: رموز Markdown/HTML، علامات الاتجاه، نصوص مختلطة، وعناوين طويلة جداً
+CORPUS = [
+    "تصميم *بوستات* انستقرام [عاجل]",
+    "كتابة سيناريو_فيديو موشن_جرافيك",
+    "دراسة جدوى & خطة عمل لمشروع مطعم",
+    "<تحليل> بيانات المبيعات باستخدام SQL",
+    'مطلوب "مبرمج" Python <script>alert(1)</script>',
+    "Need a Frontend developer (React + API) & <b>backend</b>",
+    "a < b > c & d \" e ' f * g _ h [ i ] j ` k",
+    "‏عنوان مع علامة اتجاه من اليمين‏",
+    "‎LTR mark‎ داخل ‫نص مضمن‬",
+    "⁧عزل⁩ ⁦isolate⁩ &amp; &lt;ليس كياناً&gt;",
+    "رموز 🎨🛒💻 خارج BMP مع & و < و >",
+    "&&&<<<>>>\"\"\"***___[[[]]]",
+    "[رابط](https://example.com) و **عريض** و __مائل__",
+    "   مسافات   في   البداية والنهاية   ",
+    "سطر\nجديد\tوتبويب",
+    "ترجمة ملف " + "طويل جداً & <مهم> " * 500,
+    "x" * 9000,
+]
+
+FUZZ_ALPHABET = "&<>\"'*_[]`‏‎‫‬⁧⁩🎨 abcمطلوبتصميم"
+
+class _TelegramHTMLChecker(HTMLParser):
+    """فحص أن الرسالة HTML سليمة بالوسوم التي يقبلها تليجرام فقط"""
+
+    ALLOWED = {"b", "a"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = []
+        self.errors = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.ALLOWED:
+            self.errors.append(f"unexpected <{tag}>")
+        if tag == "a" and not dict(attrs).get("href"):
+            self.errors.append("<a> without href")
+        if tag in self.stack:
+            self.errors.append(f"nested <{tag}>")
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack[-1] != tag:
+            self.errors.append(f"unbalanced </{tag}>")
+            return
+        self.stack.pop()
+
+    def handle_startendtag(self, tag, attrs):
+        self.errors.append(f"self-closing <{tag}/>")
+
+def assert_well_formed(text):
+    checker = _TelegramHTMLChecker()
+    checker.feed(text)
+    checker.close()
+    assert not checker.errors, checker.errors
+    assert not checker.stack, f"unclosed {checker.stack}"
+    # كل & يبدأ كياناً معروفاً (تليجرام يرفض & المنفردة)
+    assert not re.search(r"&(?!(?:amp|lt|gt|quot);)", text)
+
+def make_post(number, title, username="user_1 *x*"):
+    post_id = f"forum_post-{number}"
+    return Post(
+        id=post_id,
+        title=title,
+        link=f"https://khamsat.com/community/requests/{number}?a=1&b=<2>",
+        username=username,
+        time_text="منذ دقيقة",
+        timestamp="",
+        posted_at=None,
+        category_mask=classify_post_mask(title, post_id),
+    )
+
+def fuzz_titles(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(1, 120))) for _ in range(count)]
+
+@pytest.mark.parametrize("kind", [LIST, ALERT])
+def test_corpus_renders_well_formed_html_within_limit(kind):
+    posts = [make_post(1000 + i, title) for i, title in enumerate(CORPUS)]
+    chunks = chunk_posts(posts, kind)
+
+    rendered = [post for _, message_posts in chunks for post in message_posts]
+    assert sorted(rendered, key=lambda post: post.id) == sorted(posts, key=lambda post: post.id)
+    for text, _ in chunks:
+        assert utf16_length(text) <= LIMIT
+        assert_well_formed(text)
+
+def test_corpus_titles_survive_escaping():
+    for i, title in enumerate(CORPUS[:-2]):
+        post = make_post(2000 + i, title, username="<أحمد> & co")
+        (text, _), = chunk_posts([post], LIST)
+        assert escape_html(title) in text
+        assert title in unescape(text)
+        assert "<أحمد>" in unescape(text)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fuzzed_titles_render_well_formed_html(seed):
+    posts = [make_post(3000 + i, title, username=title[:20]) for i, title in enumerate(fuzz_titles(100, seed))]
+    for kind in (LIST, ALERT):
+        for text, _ in chunk_posts(posts, kind):
+            assert utf16_length(text) <= LIMIT
+            assert_well_formed(text)
+
+def test_truncated_title_does_not_cut_an_entity():
+    post = make_post(4000, "&<>" * 3000)
+    (text, _), = chunk_posts([post], LIST)
+    assert utf16_length(text) <= LIMIT
+    assert_well_formed(text)
+    assert "…</a>" in text
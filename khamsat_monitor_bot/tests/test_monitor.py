@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import monitor
+from benchmarks.fixtures import generate_posts, render_listing
+from metrics import UNDELIVERED_POSTS
+from scraper import extract_posts
+from settings_manager import settings_manager
+
+class FakeQueue:
+    """طابور إرسال يعيد Futures يحسمها الاختبار"""
+
+    def __init__(self):
+        self.futures = []
+
+    def enqueue(self, chat_id, text, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self.futures.append(future)
+        return future
+
+class OneGroup:
+    """توجيه كل المنشورات لمستخدم واحد"""
+
+    def route(self, posts, subscribers):
+        return [(posts, {1})]
+
+@pytest.fixture(autouse=True)
+def clean_sent_ids():
+    settings_manager.clear_sent_ids()
+    yield
+    settings_manager.clear_sent_ids()
+
+def fan_out(monkeypatch, count):
+    queue = FakeQueue()
+    monkeypatch.setattr(monitor, "send_queue", queue)
+    monkeypatch.setattr(monitor, "subscription_index", OneGroup())
+    post_monitor = monitor.PostMonitor()
+    posts = extract_posts(render_listing(generate_posts(count)), "stream", limit=None)
+    post_monitor._fan_out(posts)
+    return post_monitor, queue, posts
+
+def test_delivery_task_is_tracked_until_done(monkeypatch):
+    async def scenario():
+        post_monitor, queue, posts = fan_out(monkeypatch, 3)
+        assert len(post_monitor._delivery_tasks) == 1
+        for future in queue.futures:
+            future.set_result(True)
+        await asyncio.gather(*post_monitor._delivery_tasks)
+        await asyncio.sleep(0)
+        assert not post_monitor._delivery_tasks
+        assert all(post.id in post_monitor.sent_ids for post in posts)
+        assert not post_monitor.in_flight_ids
+
+    asyncio.run(scenario())
+
+def test_stop_cancels_pending_confirmations(monkeypatch):
+    async def scenario():
+        post_monitor, queue, posts = fan_out(monkeypatch, 3)
+        await post_monitor.stop()
+        assert not post_monitor._delivery_tasks
+        # لم يُحسم أي تسليم: لا شيء يُسجل كمرسل ويُعاد المنشور للفحص التالي
+        assert not any(post.id in post_monitor.sent_ids for post in posts)
+        assert not post_monitor.in_flight_ids
+
+    asyncio.run(scenario())
+
+def test_dead_lettered_post_is_marked_sent_and_counted(monkeypatch):
+    async def scenario():
+        post_monitor, queue, posts = fan_out(monkeypatch, 1)
+        before = UNDELIVERED_POSTS.value()
+        for future in queue.futures:
+            future.set_result(False)
+        await asyncio.gather(*post_monitor._delivery_tasks)
+        assert posts[0].id in post_monitor.sent_ids
+        assert UNDELIVERED_POSTS.value() == before + 1
+
+    asyncio.run(scenario())
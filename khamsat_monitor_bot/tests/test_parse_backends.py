@@ -0,0 +1,77 @@
+import glob
+import os
+
+import pytest
+
+from scraper import extract_posts
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "fixtures")
+FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+
+BACKENDS = ["html.parser", "strainer", "stream"]
+try:
+    import lxml  # noqa: F401
+    BACKENDS.append("lxml")
+except ImportError:
+    pass
+
+def row(number, title, user="علي", closed=True):
+    """صف منشور مكتمل الحقول (كل المحركات تتفق عليه حتى لو لم يُغلق)"""
+    return (
+        f"<tr class=forum_post id=forum_post-{number}><td>"
+        f"<h3 class=details-head><a href=/community/requests/{number}>{title}</a></h3>"
+        f"<a class=user href=/u/{number}>{user}</a>"
+        f"<ul><li class=d-lg-inline-block><span dir=ltr title='18/10/2026 11:5{number % 10}:00 GMT'>منذ دقيقة</span></li></ul>"
+        f"</td>{'</tr>' if closed else ''}"
+    )
+
+MALFORMED = {
+    "unclosed_rows": f"<table>{row(3, 'ثلاثة', closed=False)}{row(4, 'أربعة', closed=False)}{row(5, 'خمسة')}</table>",
+    "unclosed_last_row": f"<table>{row(6, 'ستة')}{row(7, 'سبعة', closed=False)}",
+    "stray_end_tags": f"<table></td></span>{row(8, 'ثمانية')}</a></tr>{row(9, 'تسعة')}</table>",
+    "missing_cell_ends": (
+        "<table><tr class='forum_post' id='forum_post-10'><td><h3 class='details-head'>"
+        "<a href='/community/requests/10'>عشرة</a></h3><a class='user' href='/u/10'>منى</a>"
+        "<ul><li class='d-lg-inline-block'><span dir='ltr' title='18/10/2026 11:40:00 GMT'>منذ ساعة</span></ul>"
+        f"<tr class='x'><td>صف عادي</td></tr>{row(11, 'أحد عشر')}</table>"
+    ),
+    "uppercase_tags": row(12, "اثنا عشر").replace("<tr", "<TR").replace("</tr>", "</TR>").join(["<table>", "</table>"]),
+}
+
+def backend_outputs(html, limit=None):
+    return {backend: extract_posts(html, backend, limit=limit) for backend in BACKENDS}
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_backends_agree_on_fixtures(path):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    outputs = backend_outputs(html)
+    assert outputs["html.parser"]
+    for backend, posts in outputs.items():
+        assert posts == outputs["html.parser"], backend
+
+@pytest.mark.parametrize("name", sorted(MALFORMED))
+def test_backends_agree_on_malformed_html(name):
+    outputs = backend_outputs(MALFORMED[name])
+    assert outputs["html.parser"]
+    for backend, posts in outputs.items():
+        assert posts == outputs["html.parser"], backend
+
+def test_unclosed_row_does_not_swallow_the_next_one():
+    html = (
+        "<table><tr class=forum_post id=forum_post-3><td><h3 class=details-head>"
+        "<a href=/community/requests/3>ثلاثة</a></h3>"
+        "<tr class=forum_post id=forum_post-4><td><h3 class=details-head>"
+        "<a href=/community/requests/4>أربعة</a></h3><a class=user href=/u/a>علي</a></table>"
+    )
+    for backend, posts in backend_outputs(html).items():
+        assert [post.id for post in posts] == ["forum_post-3", "forum_post-4"], backend
+    # html.parser يداخل الصفين فيأخذ الصف الأول ناشر الثاني - المستخرج المباشر لا يخلطهما
+    first, second = extract_posts(html, "stream", limit=None)
+    assert first.username == "غير معروف"
+    assert second.username == "علي"
+
+@pytest.mark.parametrize("limit", [1, 2])
+def test_stream_limit_on_unclosed_rows(limit):
+    html = MALFORMED["unclosed_rows"]
+    assert extract_posts(html, "stream", limit=limit) == extract_posts(html, "html.parser", limit=None)[:limit]
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import time
+
+from profiler import Profiler
+
+def make_profiler(tmp_path, threshold=0.2):
+    return Profiler(enabled=True, slow_threshold=threshold, trace_file=str(tmp_path / "traces.jsonl"),
+                    cprofile_top=0, cprofile_dir=str(tmp_path))
+
+def read_traces(profiler):
+    if profiler._writer is not None:
+        profiler._writer.flush()
+    with open(profiler.trace_file, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+async def held_cycle(profiler, send_seconds):
+    """دورة سريعة ترسل رسالتها في مهمة أخرى بعد انتهاء الجزء المتزامن"""
+
+    async def send(span, release):
+        await asyncio.sleep(0)
+        with profiler.span_in(span, "telegram.send"):
+            time.sleep(send_seconds)
+        release()
+
+    with profiler.trace("check_cycle"):
+        with profiler.span("fan_out"):
+            task = asyncio.create_task(send(profiler.current_span(), profiler.hold()))
+    await task
+
+def test_held_send_counts_towards_slow_threshold(tmp_path):
+    profiler = make_profiler(tmp_path)
+    asyncio.run(held_cycle(profiler, 0.3))
+
+    assert profiler.stats == {"traces": 1, "slow": 1, "profiles_kept": 0}
+    (trace,) = read_traces(profiler)
+    assert trace["wall_ms"] < 200 <= trace["elapsed_ms"]
+
+    (fan_out,) = trace["spans"]["children"]
+    # الإرسال المؤجل يُعرض منفصلاً ولا يُطرح من زمن المرحلة التي أضافته
+    assert "children" not in fan_out
+    (send,) = fan_out["deferred"]
+    assert send["name"] == "telegram.send" and send["wall_ms"] >= 300
+    assert fan_out["self_ms"] == fan_out["wall_ms"]
+
+def test_fast_held_cycle_is_not_written(tmp_path):
+    profiler = make_profiler(tmp_path)
+    asyncio.run(held_cycle(profiler, 0.0))
+
+    assert profiler.stats["slow"] == 0
+    assert profiler._writer is None
+
+def test_synchronous_children_are_subtracted_from_self_time(tmp_path):
+    profiler = make_profiler(tmp_path, threshold=0.0)
+    with profiler.trace("handler:start"):
+        with profiler.span("parse"):
+            time.sleep(0.02)
+
+    (trace,) = read_traces(profiler)
+    assert trace["spans"]["self_ms"] < trace["spans"]["children"][0]["wall_ms"]
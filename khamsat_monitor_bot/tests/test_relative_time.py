@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import scraper
+from benchmarks.fixtures import generate_posts, render_listing
+from formatter import LIST, chunk_posts, relative_time
+from scraper import FetchResult, extract_posts
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+@pytest.mark.parametrize("age, text", [
+    (timedelta(seconds=20), "منذ أقل من دقيقة"),
+    (timedelta(minutes=1), "منذ دقيقة"),
+    (timedelta(minutes=2), "منذ دقيقتين"),
+    (timedelta(minutes=5), "منذ 5 دقائق"),
+    (timedelta(minutes=15), "منذ 15 دقيقة"),
+    (timedelta(hours=2, minutes=5), "منذ ساعتين"),
+    (timedelta(hours=3), "منذ 3 ساعات"),
+    (timedelta(days=1, hours=1), "منذ يوم"),
+])
+def test_relative_time(age, text):
+    assert relative_time(NOW - age, NOW) == text
+
+def test_unknown_posted_at_keeps_page_text():
+    assert relative_time(None, NOW) is None
+
+def test_rendered_time_follows_the_clock():
+    post = extract_posts(render_listing(generate_posts(1, now=datetime.now(timezone.utc))), limit=None)[0]
+    (fresh, _), = chunk_posts([post], LIST)
+
+    post.posted_at -= timedelta(minutes=7)
+    (later, _), = chunk_posts([post], LIST)
+
+    assert "منذ أقل من دقيقة" in fresh
+    assert "منذ 7 دقائق" in later
+
+def test_unchanged_result_rechecks_recency():
+    now = datetime.now(timezone.utc)
+    posts = extract_posts(render_listing(generate_posts(3, now=now, spacing_seconds=60)), limit=None)
+    state = {"digest": "d", "result": (list(posts), posts)}
+
+    assert len(scraper._unchanged_result(state).recent_posts) == 3
+
+    for post in posts:
+        post.posted_at -= timedelta(seconds=90)
+    result = scraper._unchanged_result(state)
+
+    assert result.status == FetchResult.UNCHANGED
+    assert [post.id for post in result.recent_posts] == [posts[0].id, posts[1].id]
+    assert result.all_posts == posts
@@ -0,0 +1,46 @@
+from scheduler import AdaptiveScheduler
+
+def make_scheduler(**kwargs):
+    return AdaptiveScheduler(min_interval=10, max_interval=180, initial_interval=30,
+                             target_posts=0.5, quiet_backoff=1.5, rate_window=900, jitter=0.1, **kwargs)
+
+def test_error_backoff_doubles_from_current_interval_up_to_max():
+    scheduler = make_scheduler()
+    delays = []
+    for _ in range(6):
+        scheduler.record_error()
+        delays.append(scheduler.current_delay())
+
+    assert delays == [30, 60, 120, 180, 180, 180]
+
+def test_success_after_errors_resets_backoff():
+    scheduler = make_scheduler()
+    for _ in range(4):
+        scheduler.record_error()
+    scheduler.record_success(0, now=0)
+
+    assert scheduler.consecutive_errors == 0
+    assert scheduler.current_delay() == 45
+
+def test_interval_stays_within_bounds():
+    scheduler = make_scheduler()
+    now = 0
+    for _ in range(20):
+        now += scheduler.current_delay()
+        scheduler.record_success(20, now=now)
+        assert 10 <= scheduler.current_delay() <= 180
+    assert scheduler.current_delay() == 10
+
+    # هدوء طويل: إبطاء تدريجي (لا يقصر أبداً) مع تلاشي المعدل حتى الحد الأقصى
+    previous = scheduler.current_delay()
+    for _ in range(300):
+        now += scheduler.current_delay()
+        scheduler.record_success(0, now=now)
+        assert previous <= scheduler.current_delay() <= 180
+        previous = scheduler.current_delay()
+    assert scheduler.current_delay() == 180
+
+def test_next_delay_jitter_is_bounded():
+    scheduler = make_scheduler()
+    delays = [scheduler.next_delay() for _ in range(200)]
+    assert all(27 <= delay <= 33 for delay in delays)
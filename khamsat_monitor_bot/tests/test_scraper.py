@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+import scraper
+from benchmarks.fixtures import generate_posts, render_listing
+from scraper import FetchResult, fetch_listing, listing_digest
+
+class FakeResponse:
+    def __init__(self, text):
+        self.status_code = 200
+        self.headers = {}
+        self.text = text
+
+class FakeClient:
+    """عميل HTTP يعيد نفس الصفحة في كل طلب"""
+
+    def __init__(self, text):
+        self.text = text
+
+    async def get(self, url, headers=None):
+        return FakeResponse(self.text)
+
+@pytest.fixture(autouse=True)
+def clean_page_states():
+    scraper._page_states.clear()
+    yield
+    scraper._page_states.clear()
+
+def fetch_twice(html):
+    client = FakeClient(html)
+
+    async def scenario():
+        return await fetch_listing(client), await fetch_listing(client)
+
+    return asyncio.run(scenario())
+
+def test_digest_counts_unquoted_class_rows():
+    quoted = '<tr class="forum_post" id="forum_post-1"><td></td></tr>'
+    unquoted = '<tr class=forum_post id=forum_post-1><td></td></tr>'
+    assert listing_digest(quoted) is not None
+    assert listing_digest(unquoted) is not None
+    assert listing_digest(unquoted) != listing_digest(unquoted.replace("-1", "-2"))
+
+def test_digest_is_none_without_rows():
+    assert listing_digest("<table><tr class='other'><td></td></tr></table>") is None
+
+def test_same_listing_is_unchanged():
+    first, second = fetch_twice(render_listing(generate_posts(5)))
+    assert first.status == FetchResult.OK
+    assert second.status == FetchResult.UNCHANGED
+
+def test_page_without_recognised_rows_is_never_unchanged():
+    # صفوف لا يطابقها التعبير المنتظم: يجب تحليل كل جلب بدل اعتبار الصفحة ثابتة
+    html = render_listing(generate_posts(5)).replace('class="forum_post', 'class="post_row forum_post_v2')
+    first, second = fetch_twice(html)
+    assert first.status == FetchResult.OK
+    assert second.status == FetchResult.OK
+    assert second.digest is None
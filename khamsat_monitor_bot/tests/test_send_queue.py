@@ -0,0 +1,68 @@
+import asyncio
+import json
+import time
+
+from telegram.error import Forbidden, RetryAfter
+
+from send_queue import MessageQueue
+
+class FakeBot:
+    """بوت يسجل وقت كل إرسال ويرفع الأخطاء المجهزة بالترتيب"""
+
+    def __init__(self, errors=(), always=None):
+        self.errors = list(errors)
+        self.always = always
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.always is not None:
+            raise self.always
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, time.monotonic()))
+
+def make_queue(tmp_path, **kwargs):
+    return MessageQueue(global_rate=1000, per_chat_rate=1000,
+                        dead_letter_file=str(tmp_path / "dead_letters.json"), **kwargs)
+
+def test_retry_after_pauses_every_worker(tmp_path):
+    async def scenario():
+        queue = make_queue(tmp_path, workers=3)
+        bot = FakeBot(errors=[RetryAfter(0.3)])
+        queue.start(bot)
+        started = time.monotonic()
+        futures = [queue.enqueue(chat_id, "x") for chat_id in (1, 2, 3)]
+        results = await asyncio.wait_for(asyncio.gather(*futures), 5)
+        await queue.stop()
+        return started, bot, queue, results
+
+    started, bot, queue, results = asyncio.run(scenario())
+    assert results == [True, True, True]
+    assert queue.stats["rate_limited"] == 1 and queue.stats["paused"] == 1
+    # لا عامل يرسل لأي محادثة (وليس فقط المحادثة المرفوضة) قبل انتهاء الإيقاف
+    assert sorted(chat_id for chat_id, _ in bot.sent) == [1, 2, 3]
+    assert min(sent_at for _, sent_at in bot.sent) - started >= 0.3 - 0.01
+
+def test_dead_letters_keep_only_last_500(tmp_path):
+    path = tmp_path / "dead_letters.json"
+    path.write_text(json.dumps([{"chat_id": -i, "text": "old"} for i in range(499)]), encoding="utf-8")
+
+    async def scenario():
+        queue = make_queue(tmp_path, workers=2)
+        queue.start(FakeBot(always=Forbidden("bot was blocked by the user")))
+        results = await asyncio.gather(*(queue.enqueue(chat_id, "new") for chat_id in (1, 2, 3)))
+        # الـ Future تُحسم قبل كتابة الملف - انتظار انتهاء العمال من كل الرسائل
+        await queue._queue.join()
+        await queue.stop()
+        return queue, results
+
+    queue, results = asyncio.run(scenario())
+    assert results == [False, False, False]
+    assert queue.stats["dead_lettered"] == 3
+
+    dead_letters = json.loads(path.read_text(encoding="utf-8"))
+    assert len(dead_letters) == 500
+    # أقدم رسالتين حُذفتا والجديدة في النهاية
+    assert dead_letters[0]["chat_id"] == -2
+    assert sorted(entry["chat_id"] for entry in dead_letters[-3:]) == [1, 2, 3]
+    assert all(entry["error"] for entry in dead_letters[-3:])
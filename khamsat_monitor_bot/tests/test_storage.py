@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+import settings_manager as settings_manager_module
+from settings_manager import SettingsManager
+from storage import JsonStore, SQLiteStore
+
+SETTINGS = {
+    "monitoring_active": True,
+    "last_sent_ids": ["forum_post-1", "forum_post-2"],
+    "last_seen_post": 700123,
+    "muted_users": [42, 77],
+    "user_categories": {"42": ["تصميم", "برمجة"], "77": ["__none__"]},
+}
+
+USERS = {
+    "approved_users": [1, 2],
+    "rejected_users": [2, 3],
+    "pending_users": {
+        "1": {"username": "a", "first_name": "أ", "timestamp": "2026-10-18 10:00:00"},
+        "3": {"username": "c", "first_name": "ج", "timestamp": "2026-10-18 10:01:00"},
+        "4": {"username": "d", "first_name": "د", "timestamp": "2026-10-18 10:02:00"},
+    },
+}
+
+def test_import_keeps_every_setting(tmp_path):
+    store = SQLiteStore(str(tmp_path / "bot.db"))
+    store.import_documents(SETTINGS, USERS)
+
+    assert store.load("settings") == SETTINGS
+
+def test_import_resolves_conflicting_user_buckets_like_user_manager(tmp_path):
+    store = SQLiteStore(str(tmp_path / "bot.db"))
+    store.import_documents(SETTINGS, USERS)
+
+    users = store.load("users")
+    # معتمد ثم مرفوض ثم انتظار
+    assert sorted(users["approved_users"]) == [1, 2]
+    assert users["rejected_users"] == [3]
+    assert list(users["pending_users"]) == ["4"]
+    assert users["pending_users"]["4"]["first_name"] == "د"
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_settings_round_trip(tmp_path, monkeypatch, backend):
+    monkeypatch.setattr(settings_manager_module, "DEDUP_LOG_FILE", str(tmp_path / "sent_ids.log"))
+
+    def open_store():
+        if backend == "json":
+            return JsonStore(str(tmp_path / "bot_settings.json"))
+        return SQLiteStore(str(tmp_path / "bot.db"))
+
+    manager = SettingsManager(store=open_store())
+    manager.set_user_alerts(42, False)
+    manager.set_selected_categories(["تصميم", "برمجة"], user_id=42)
+    manager.set_last_seen_post(700123)
+    manager.add_sent_ids(["forum_post-1", "forum_post-2"])
+    manager.flush()
+
+    # بدون سجل المعرفات تُستعاد من المخزن نفسه
+    os.remove(tmp_path / "sent_ids.log")
+    reloaded = SettingsManager(store=open_store())
+    assert reloaded.muted_users == {42}
+    assert not reloaded.is_user_alerts_enabled(42)
+    assert reloaded.get_selected_categories(42) == ["تصميم", "برمجة"]
+    assert reloaded.get_last_seen_post() == 700123
+    assert reloaded.sent_ids.ids() == ["forum_post-1", "forum_post-2"]
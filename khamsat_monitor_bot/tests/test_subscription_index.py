@@ -0,0 +1,54 @@
+import pytest
+
+from benchmarks.fixtures import generate_posts, render_listing
+from benchmarks.hot_path import random_selections
+from categories import CATEGORY_NAMES
+from post_filter import filter_posts_by_selection
+from scraper import extract_posts
+from subscription_index import SubscriptionIndex
+
+def routed(groups):
+    """{user_id: [معرفات المنشورات]} من نتيجة route"""
+    return {user_id: [post.id for post in posts] for posts, user_ids in groups for user_id in user_ids}
+
+def expected(posts, selections, subscribers):
+    result = {}
+    for user_id in subscribers:
+        matched = filter_posts_by_selection(posts, selections.get(user_id, []))
+        if matched:
+            result[user_id] = [post.id for post in matched]
+    return result
+
+@pytest.mark.parametrize("count", [1, 7, 70])
+def test_route_matches_per_user_filtering(count):
+    posts = extract_posts(render_listing(generate_posts(count)), "stream", limit=None)
+    selections = random_selections(300, CATEGORY_NAMES, seed=count)
+    index = SubscriptionIndex()
+    index.load(selections)
+    # بعض المشتركين بلا إعدادات محفوظة (كل الفئات) وبعض أصحاب الإعدادات غير مشتركين
+    subscribers = set(range(50, 400))
+
+    groups = index.route(posts, subscribers)
+
+    assert routed(groups) == expected(posts, selections, subscribers)
+    # كل مستخدم في مجموعة واحدة فقط، والمجموعات بمنشورات مختلفة
+    assert sum(len(user_ids) for _, user_ids in groups) == len(routed(groups))
+    assert len({tuple(post.id for post in group_posts) for group_posts, _ in groups}) == len(groups)
+
+def test_update_moves_user_between_categories():
+    posts = extract_posts(render_listing(generate_posts(30)), "stream", limit=None)
+    index = SubscriptionIndex()
+    index.load({1: [CATEGORY_NAMES[0]]})
+    index.update(1, [CATEGORY_NAMES[1]])
+    index.update(2, ["__none__"])
+
+    routes = routed(index.route(posts, {1, 2}))
+
+    assert routes.get(1, []) == [post.id for post in filter_posts_by_selection(posts, [CATEGORY_NAMES[1]])]
+    assert 2 not in routes
+    assert all(index.by_category.values())
+
+def test_route_without_posts():
+    index = SubscriptionIndex()
+    index.load({1: [], 2: [CATEGORY_NAMES[0]]})
+    assert index.route([], {1, 2, 3}) == []
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from scraper import _TIMESTAMP_RE, _parse_timestamp_text, parse_timestamp
+
+def parse_with_regex(text):
+    """المرجع: التحليل بالتعبير المنتظم وحده"""
+    match = _TIMESTAMP_RE.search(text)
+    if not match:
+        return None
+    day, month, year, hour, minute, second = map(int, match.groups())
+    try:
+        return datetime(year, month, day, hour, minute, second, tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def parse_fast(text):
+    try:
+        return _parse_timestamp_text(text)
+    except ValueError:
+        return None
+
+@pytest.mark.parametrize("text", [
+    "18/10/2026 09:05:07 GMT",
+    "1/2/2026 09:05:07 GMT",          # خانة واحدة لليوم والشهر: المسار البطيء
+    "18/10/2026  9:05:07 GMT",        # ساعة بخانة واحدة بعد مسافتين: مواقع ثابتة صحيحة بالصدفة
+    "18/10/2026 10: 5:07 GMT",        # int(" 5") يقبلها والتعبير المنتظم يرفضها
+    "18/10/2026 10:+5:07 GMT",
+    "18/10/2026T10:05:07 GMT",        # لا فاصل مسافة بين التاريخ والوقت
+    "31/02/2026 10:05:07 GMT",        # تاريخ غير موجود
+    "١٨/١٠/٢٠٢٦ ١٠:٠٥:٠٧",            # أرقام عربية هندية يقبلها الطرفان
+    "منذ 5 دقائق",
+])
+def test_fast_path_agrees_with_regex(text):
+    assert parse_fast(text) == parse_with_regex(text)
+
+def test_parse_timestamp_returns_none_for_rejected_text():
+    assert parse_timestamp("18/10/2026 10: 5:07 GMT", "forum_post-timestamp-test") is None
+    assert parse_timestamp("18/10/2026 10:05:07 GMT", "forum_post-timestamp-test") == datetime(
+        2026, 10, 18, 10, 5, 7, tzinfo=timezone.utc
+    )
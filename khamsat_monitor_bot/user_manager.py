@@ -1,10 +1,14 @@
-import json
-import os
 from config import ALLOWED_USER_ID, logger
+from storage import create_store
+
+APPROVED = "approved"
+PENDING = "pending"
+REJECTED = "rejected"
 
 class UserManager:
-    def __init__(self, users_file="bot_users.json"):
+    def __init__(self, users_file="bot_users.json", store=None):
         self.users_file = users_file
+        self.store = store or create_store(users_file)
         self.admin_id = ALLOWED_USER_ID
         self.default_data = {
             "approved_users": [ALLOWED_USER_ID],  # الأدمن معتمد افتراضياً
@@ -12,13 +16,43 @@ class UserManager:
             "rejected_users": []
         }
         self.users_data = self.load_users()
+        self.store.attach(self.users_data)
+        # فهارس في الذاكرة لفحص الحالة بزمن ثابت (البيانات على القرص بنفس الشكل)
+        self._status = {}
+        self._members = {APPROVED: set(), PENDING: set(), REJECTED: set()}
+        self._build_index()
+    
+    def _build_index(self):
+        """بناء فهارس الحالة من بيانات المستخدمين"""
+        self._status.clear()
+        for members in self._members.values():
+            members.clear()
+        
+        # الأولوية عند التعارض: معتمد ثم مرفوض ثم انتظار
+        for user_id in self.users_data.get("pending_users", {}):
+            self._set_status(int(user_id), PENDING)
+        for user_id in self.users_data.get("rejected_users", []):
+            self._set_status(user_id, REJECTED)
+        for user_id in self.users_data.get("approved_users", []):
+            self._set_status(user_id, APPROVED)
+    
+    def _set_status(self, user_id, status):
+        """تحديث فهرس الحالة لمستخدم"""
+        previous = self._status.get(user_id)
+        if previous is not None:
+            self._members[previous].discard(user_id)
+        self._status[user_id] = status
+        self._members[status].add(user_id)
+    
+    def status(self, user_id):
+        """حالة المستخدم: approved أو pending أو rejected أو None لمستخدم جديد"""
+        return self._status.get(user_id)
     
     def load_users(self):
         """تحميل بيانات المستخدمين"""
         try:
-            if os.path.exists(self.users_file):
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+            data = self.store.load("users")
+            if data is not None:
                 logger.info(f"✅ تم تحميل بيانات المستخدمين: {len(data.get('approved_users', []))} معتمد")
                 return data
             else:
@@ -29,13 +63,8 @@ class UserManager:
             return self.default_data.copy()
     
     def save_users(self):
-        """حفظ بيانات المستخدمين"""
-        try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(self.users_data, f, ensure_ascii=False, indent=2)
-            logger.debug("💾 تم حفظ بيانات المستخدمين")
-        except Exception as e:
-            logger.error(f"❌ خطأ في حفظ بيانات المستخدمين: {e}")
+        """حفظ بيانات المستخدمين فوراً"""
+        self.store.flush()
     
     def is_admin(self, user_id):
         """فحص إذا كان المستخدم أدمن"""
@@ -43,15 +72,15 @@ class UserManager:
     
     def is_approved(self, user_id):
         """فحص إذا كان المستخدم معتمد"""
-        return user_id in self.users_data.get("approved_users", [])
+        return self._status.get(user_id) == APPROVED
     
     def is_pending(self, user_id):
         """فحص إذا كان المستخدم في انتظار الموافقة"""
-        return str(user_id) in self.users_data.get("pending_users", {})
+        return self._status.get(int(user_id)) == PENDING
     
     def is_rejected(self, user_id):
         """فحص إذا كان المستخدم مرفوض"""
-        return user_id in self.users_data.get("rejected_users", [])
+        return self._status.get(user_id) == REJECTED
     
     def add_pending_user(self, user_id, username, first_name):
         """إضافة مستخدم للانتظار"""
@@ -61,14 +90,17 @@ class UserManager:
             return False
         
         # إزالة من قائمة المرفوضين إذا كان موجود
-        if user_id in self.users_data.get("rejected_users", []):
+        if user_id in self._members[REJECTED]:
             self.users_data["rejected_users"].remove(user_id)
         
-        self.users_data["pending_users"][str(user_id)] = {
+        user_info = {
             "username": username or "غير محدد",
             "first_name": first_name or "غير محدد",
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
+        self.users_data["pending_users"][str(user_id)] = user_info
+        self._set_status(user_id, PENDING)
+        self.store.set_user_status(user_id, PENDING, user_info)
         self.save_users()
         logger.info(f"⏳ تم إضافة مستخدم للانتظار: {first_name} (@{username})")
         return True
@@ -80,12 +112,14 @@ class UserManager:
             user_info = self.users_data["pending_users"][user_id_str]
             
             # نقل المستخدم إلى قائمة المعتمدين
-            if user_id not in self.users_data["approved_users"]:
+            if user_id not in self._members[APPROVED]:
                 self.users_data["approved_users"].append(user_id)
             
             # حذف من قائمة الانتظار
             del self.users_data["pending_users"][user_id_str]
             
+            self._set_status(user_id, APPROVED)
+            self.store.set_user_status(user_id, APPROVED)
             self.save_users()
             logger.info(f"✅ تم اعتماد المستخدم: {user_info['first_name']}")
             return user_info
@@ -98,12 +132,14 @@ class UserManager:
             user_info = self.users_data["pending_users"][user_id_str]
             
             # نقل المستخدم إلى قائمة المرفوضين
-            if user_id not in self.users_data["rejected_users"]:
+            if user_id not in self._members[REJECTED]:
                 self.users_data["rejected_users"].append(user_id)
             
             # حذف من قائمة الانتظار
             del self.users_data["pending_users"][user_id_str]
             
+            self._set_status(user_id, REJECTED)
+            self.store.set_user_status(user_id, REJECTED)
             self.save_users()
             logger.info(f"❌ تم رفض المستخدم: {user_info['first_name']}")
             return user_info
@@ -117,6 +153,10 @@ class UserManager:
         """الحصول على قائمة المستخدمين المعتمدين"""
         return self.users_data.get("approved_users", [])
     
+    def get_approved_ids(self):
+        """مجموعة معرفات المستخدمين المعتمدين (للقراءة فقط)"""
+        return frozenset(self._members[APPROVED])
+    
     def get_stats(self):
         """إحصائيات المستخدمين"""
         return {